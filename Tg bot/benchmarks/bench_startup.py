@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark against a local fake Bot API.
+
+Measures how long a fresh interpreter takes to import the entry point and
+the bot modules, then starts run.py as a subprocess pointed at FakeBotApi
+with one /start update waiting and times how long it takes until the bot
+answers it (time-to-first-update). The run is repeated cold (no warm-start
+snapshot) and warm (snapshot left by the previous run).
+
+Usage:
+    python benchmarks/bench_startup.py --runs 3 --rtt 0.1
+    python benchmarks/bench_startup.py --json startup.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+
+from fake_bot_api import FakeBotApi, command_update
+
+BENCH_TOKEN = "4242:bench-startup"
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="repetitions of each measurement")
+    parser.add_argument("--rtt", type=float, default=0.1,
+                        help="simulated Bot API round trip for getMe/getChat/sendMessage (s)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="give up on a start after this many seconds")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    return parser.parse_args()
+
+def import_time(module: str) -> float:
+    """Seconds a fresh interpreter spends importing a module from the bot directory."""
+    code = (
+        "import time; started = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - started)"
+    )
+    env = dict(os.environ, BOT_TOKEN=BENCH_TOKEN)
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=BOT_DIR, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+async def time_to_first_update(args: argparse.Namespace, snapshot_path: str) -> Dict[str, float]:
+    """Start run.py against a fresh fake API and time it until /start is answered."""
+    api = FakeBotApi(rtt=args.rtt)
+    api.pending_updates.append(command_update(1, 1001, "/start"))
+    await api.start()
+    
+    env = dict(
+        os.environ, BOT_TOKEN=BENCH_TOKEN, BOT_API_BASE_URL=api.base_url, BOT_MODE="polling",
+        BOT_WORKERS="1", METRICS_PORT="0", VERIFIED_STORE_PATH="", CHANNELS_CONFIG_PATH="",
+        WARM_START_PATH=snapshot_path, LOG_LEVEL="WARNING"
+    )
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "run.py", cwd=BOT_DIR, env=env,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+    )
+    try:
+        deadline = started + args.timeout
+        while "sendMessage" not in api.first_call_at:
+            if process.returncode is not None or time.perf_counter() > deadline:
+                raise RuntimeError("bot did not answer the first update")
+            await asyncio.sleep(0.005)
+        first_reply = api.first_call_at["sendMessage"] - started
+        first_poll = api.first_call_at.get("getUpdates", 0.0) - started
+        # Give a warm start's background refresh the chance to save its snapshot
+        await asyncio.sleep(args.rtt * 4)
+    finally:
+        if process.returncode is None:
+            process.terminate()
+        await process.wait()
+        await api.stop()
+    
+    return {
+        "first_poll_s": first_poll,
+        "first_reply_s": first_reply,
+        "get_me_calls": api.calls["getMe"],
+        "get_chat_calls": api.calls["getChat"],
+    }
+
+def summarize(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+async def run_benchmark(args: argparse.Namespace) -> Dict:
+    results = {
+        "import_run_s": statistics.median(import_time("run") for _ in range(args.runs)),
+        "import_bot_s": statistics.median(import_time("bot") for _ in range(args.runs)),
+    }
+    
+    cold, warm = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = os.path.join(tmp, "warm_start.json")
+        for _ in range(args.runs):
+            if os.path.exists(snapshot_path):
+                os.remove(snapshot_path)
+            cold.append(await time_to_first_update(args, snapshot_path))
+            warm.append(await time_to_first_update(args, snapshot_path))
+    results["cold"] = summarize(cold)
+    results["warm"] = summarize(warm)
+    return results
+
+def main() -> int:
+    args = parse_args()
+    results = asyncio.run(run_benchmark(args))
+    
+    print(f"Startup benchmark ({args.runs} runs, simulated RTT {args.rtt * 1000:.0f} ms, medians)")
+    print(f"  import run.py        {results['import_run_s'] * 1000:8.1f} ms")
+    print(f"  import bot           {results['import_bot_s'] * 1000:8.1f} ms")
+    print(f"  {'':20} {'first poll':>12} {'first reply':>12} {'getMe':>6} {'getChat':>8}")
+    for name in ("cold", "warm"):
+        row = results[name]
+        print(f"  {name + ' start':20} {row['first_poll_s'] * 1000:9.1f} ms {row['first_reply_s'] * 1000:9.1f} ms "
+              f"{row['get_me_calls']:6.0f} {row['get_chat_calls']:8.0f}")
+    
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
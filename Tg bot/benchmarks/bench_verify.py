@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Verification load test against a local fake Bot API.
+
+Starts FakeBotApi, builds the real application (same setup_handlers as
+production, no updater) pointed at it, and drives N concurrent simulated
+users through /start, /verify, the "verify" callback and the
+"force_verify" callback. Reports p50/p95/p99 latency per step, throughput
+and getChatMember calls per verification.
+
+Usage:
+    python benchmarks/bench_verify.py --users 500 --concurrency 50 --latency 0.05
+    python benchmarks/bench_verify.py --json results.json --fail-p95-ms 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+
+from fake_bot_api import FakeBotApi, callback_update, command_update
+
+STEPS = ("start", "verify_command", "verify_callback", "force_verify_callback")
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="simulated users in total")
+    parser.add_argument("--concurrency", type=int, default=50, help="users active at the same time")
+    parser.add_argument("--latency", type=float, default=0.05, help="mean getChatMember latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="getChatMember latency jitter (s)")
+    parser.add_argument("--member-rate", type=float, default=0.8, help="probability a user joined a channel")
+    parser.add_argument("--inaccessible-rate", type=float, default=0.0,
+                        help="share of getChatMember calls failing with 'member list is inaccessible'")
+    parser.add_argument("--retry-after-rate", type=float, default=0.0,
+                        help="share of getChatMember calls failing with RetryAfter")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--real-rate-limits", action="store_true",
+                        help="keep the production rate limits instead of lifting them")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    parser.add_argument("--fail-p95-ms", type=float, default=0.0,
+                        help="exit with status 1 if verify p95 latency exceeds this many ms")
+    return parser.parse_args()
+
+async def run_benchmark(args: argparse.Namespace) -> Dict:
+    api = FakeBotApi(
+        latency=args.latency, jitter=args.jitter, member_rate=args.member_rate,
+        inaccessible_rate=args.inaccessible_rate, retry_after_rate=args.retry_after_rate,
+        seed=args.seed
+    )
+    await api.start()
+    
+    # Configuration is read at import time, so set it before importing the bot
+    os.environ["BOT_API_BASE_URL"] = api.base_url
+    # Keep the run away from the real bot's files and metrics port
+    os.environ.setdefault("VERIFIED_STORE_PATH", "")
+    os.environ.setdefault("WARM_START_PATH", "")
+    os.environ.setdefault("METRICS_PORT", "0")
+    if not args.real_rate_limits:
+        os.environ["RATE_LIMIT_OVERALL"] = "1000000"
+        os.environ["RATE_LIMIT_PER_CHAT"] = "1000000"
+        os.environ["RATE_LIMIT_PER_CHAT_BURST"] = "1000000"
+    
+    from telegram import Update
+    from bot import TelegramVerificationBot
+    from log_setup import configure_logging
+    
+    configure_logging(level=os.environ.get("LOG_LEVEL", "WARNING"))
+    
+    application = TelegramVerificationBot("123456:BENCHMARK").build_application(with_updater=False)
+    latencies: Dict[str, List[float]] = {step: [] for step in STEPS}
+    update_ids = iter(range(1, 10 ** 9))
+    semaphore = asyncio.Semaphore(args.concurrency)
+    
+    async def step(name: str, data: dict) -> None:
+        update = Update.de_json(data, application.bot)
+        started = time.perf_counter()
+        await application.process_update(update)
+        latencies[name].append(time.perf_counter() - started)
+    
+    async def simulate_user(user_id: int) -> None:
+        async with semaphore:
+            await step("start", command_update(next(update_ids), user_id, "/start"))
+            await step("verify_command", command_update(next(update_ids), user_id, "/verify"))
+            await step("verify_callback", callback_update(next(update_ids), user_id, "verify"))
+            await step("force_verify_callback", callback_update(next(update_ids), user_id, "force_verify"))
+    
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        api.calls.clear()
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(simulate_user(10_000 + i) for i in range(args.users)))
+        elapsed = time.perf_counter() - started
+        
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+    await api.stop()
+    
+    verifications = len(latencies["verify_command"]) + len(latencies["verify_callback"])
+    total_steps = sum(len(values) for values in latencies.values())
+    return {
+        "users": args.users,
+        "concurrency": args.concurrency,
+        "elapsed_seconds": elapsed,
+        "throughput_updates_per_second": total_steps / elapsed if elapsed else 0.0,
+        "verifications": verifications,
+        "get_chat_member_calls": api.calls["getChatMember"],
+        "api_calls_per_verification": api.calls["getChatMember"] / verifications if verifications else 0.0,
+        "api_calls": dict(api.calls),
+        "latency_ms": {
+            name: {
+                "p50": percentile(values, 50) * 1000,
+                "p95": percentile(values, 95) * 1000,
+                "p99": percentile(values, 99) * 1000,
+                "max": max(values, default=0.0) * 1000,
+            }
+            for name, values in latencies.items()
+        },
+    }
+
+def print_report(results: Dict) -> None:
+    print(f"users={results['users']} concurrency={results['concurrency']} "
+          f"elapsed={results['elapsed_seconds']:.2f}s "
+          f"throughput={results['throughput_updates_per_second']:.1f} updates/s")
+    print(f"getChatMember calls={results['get_chat_member_calls']} "
+          f"per verification={results['api_calls_per_verification']:.2f} "
+          f"editMessageText calls={results['api_calls'].get('editMessageText', 0)}")
+    print(f"{'step':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stats in results["latency_ms"].items():
+        print(f"{name:<24}{stats['p50']:>10.1f}{stats['p95']:>10.1f}{stats['p99']:>10.1f}{stats['max']:>10.1f}")
+
+def main() -> int:
+    args = parse_args()
+    results = asyncio.run(run_benchmark(args))
+    print_report(results)
+    
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    
+    verify_p95 = max(results["latency_ms"]["verify_command"]["p95"],
+                     results["latency_ms"]["verify_callback"]["p95"])
+    if args.fail_p95_ms and verify_p95 > args.fail_p95_ms:
+        print(f"FAIL: verify p95 {verify_p95:.1f} ms exceeds {args.fail_p95_ms:.1f} ms")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
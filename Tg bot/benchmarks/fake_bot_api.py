@@ -0,0 +1,234 @@
+"""
+Local stand-in for the Telegram Bot API used by the benchmarks.
+
+Serves just enough of the Bot API over HTTP/1.1 (with keep-alive) for the bot
+to run: getMe, getChat, getChatMember, sendMessage, editMessageText,
+answerCallbackQuery, getUpdates and the webhook calls. getChatMember
+simulates latency, privacy errors, flood waits and a configurable membership
+distribution.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+BOT_USER = {"id": 4242, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+
+class FakeBotApi:
+    """In-process HTTP server emulating the parts of the Bot API the bot uses."""
+    
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, member_rate: float = 0.8,
+                 inaccessible_rate: float = 0.0, retry_after_rate: float = 0.0,
+                 retry_after: int = 1, seed: int = 0, rtt: float = 0.0):
+        """
+        Configure the simulation.
+        
+        Args:
+            latency: Mean seconds getChatMember takes to answer
+            jitter: Maximum random seconds added to or removed from latency
+            member_rate: Probability a (user, channel) pair is a member
+            inaccessible_rate: Probability getChatMember fails with "member list is inaccessible"
+            retry_after_rate: Probability getChatMember fails with a flood wait
+            retry_after: Seconds reported in simulated flood waits
+            seed: Seed for the random error/latency stream and membership hashing
+            rtt: Seconds added to every other call (except getUpdates) to model the network
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.member_rate = member_rate
+        self.inaccessible_rate = inaccessible_rate
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.seed = seed
+        self.rtt = rtt
+        
+        self.calls: Counter = Counter()
+        self.first_call_at: Dict[str, float] = {}
+        self.pending_updates: List[dict] = []
+        self.first_get_updates_at: Optional[float] = None
+        self._random = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._message_ids = 0
+        self.port = 0
+    
+    @property
+    def base_url(self) -> str:
+        """Value for BOT_API_BASE_URL pointing at this server."""
+        return f"http://127.0.0.1:{self.port}/bot"
+    
+    async def start(self, port: int = 0) -> None:
+        """Start listening on 127.0.0.1 (an ephemeral port if port is 0)."""
+        self._server = await asyncio.start_server(self._handle_connection, "127.0.0.1", port)
+        self.port = self._server.sockets[0].getsockname()[1]
+    
+    async def stop(self) -> None:
+        """Stop the server."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+    
+    def is_member(self, user_id: int, chat_id: str) -> bool:
+        """Deterministic membership for a (user, channel) pair."""
+        digest = hashlib.blake2b(f"{self.seed}:{user_id}:{chat_id}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2 ** 64 < self.member_rate
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+                path = request_line.decode("latin-1").split(" ")[1]
+                status, payload = await self._dispatch(path.rsplit("/", 1)[-1], headers, body)
+                
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    
+    def _parse_params(self, headers: Dict[str, str], body: bytes) -> dict:
+        if not body:
+            return {}
+        if headers.get("content-type", "").startswith("application/json"):
+            return json.loads(body)
+        params = {}
+        for key, values in parse_qs(body.decode()).items():
+            try:
+                params[key] = json.loads(values[0])
+            except ValueError:
+                params[key] = values[0]
+        return params
+    
+    def _message(self, chat_id: int) -> dict:
+        self._message_ids += 1
+        return {
+            "message_id": self._message_ids,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": "ok",
+        }
+    
+    async def _dispatch(self, method: str, headers: Dict[str, str], body: bytes):
+        self.calls[method] += 1
+        self.first_call_at.setdefault(method, time.perf_counter())
+        if self.rtt and method not in ("getChatMember", "getUpdates"):
+            await asyncio.sleep(self.rtt)
+        params = self._parse_params(headers, body)
+        
+        if method == "getChatMember":
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+            await asyncio.sleep(max(0.0, delay))
+            
+            roll = self._random.random()
+            if roll < self.inaccessible_rate:
+                self.calls["getChatMember:inaccessible"] += 1
+                return 400, {"ok": False, "error_code": 400,
+                             "description": "Bad Request: member list is inaccessible"}
+            if roll < self.inaccessible_rate + self.retry_after_rate:
+                self.calls["getChatMember:retry_after"] += 1
+                return 429, {"ok": False, "error_code": 429,
+                             "description": f"Too Many Requests: retry after {self.retry_after}",
+                             "parameters": {"retry_after": self.retry_after}}
+            
+            user_id = int(params.get("user_id", 0))
+            if user_id == BOT_USER["id"]:
+                status = "administrator"
+            else:
+                status = "member" if self.is_member(user_id, str(params.get("chat_id"))) else "left"
+            member = {"status": status, "user": {"id": user_id, "is_bot": False, "first_name": "User"}}
+            if status == "administrator":
+                member.update(can_be_edited=False, is_anonymous=False, can_manage_chat=True,
+                              can_delete_messages=True, can_manage_video_chats=True,
+                              can_restrict_members=True, can_promote_members=False,
+                              can_change_info=True, can_invite_users=True,
+                              can_post_stories=False, can_edit_stories=False,
+                              can_delete_stories=False)
+            return 200, {"ok": True, "result": member}
+        
+        if method == "getMe":
+            return 200, {"ok": True, "result": BOT_USER}
+        if method == "getChat":
+            chat_id = str(params.get("chat_id"))
+            digest = hashlib.blake2b(chat_id.encode(), digest_size=4).digest()
+            return 200, {"ok": True, "result": {
+                "id": -1000000000000 - int.from_bytes(digest, "big"),
+                "type": "channel",
+                "title": chat_id.lstrip("@"),
+                "username": chat_id.lstrip("@"),
+                "accent_color_id": 0,
+                "max_reaction_count": 11,
+                "accepted_gift_types": {
+                    "unlimited_gifts": False, "limited_gifts": False,
+                    "unique_gifts": False, "premium_subscription": False,
+                    "gifts_from_channels": False,
+                },
+            }}
+        if method in ("sendMessage", "editMessageText"):
+            return 200, {"ok": True, "result": self._message(int(params.get("chat_id", 1) or 1))}
+        if method == "getUpdates":
+            if self.first_get_updates_at is None:
+                self.first_get_updates_at = time.perf_counter()
+            if not self.pending_updates:
+                await asyncio.sleep(min(float(params.get("timeout", 0) or 0), 0.1))
+            updates, self.pending_updates = self.pending_updates, []
+            return 200, {"ok": True, "result": updates}
+        # answerCallbackQuery, deleteWebhook, setWebhook, ...
+        return 200, {"ok": True, "result": True}
+
+def command_update(update_id: int, user_id: int, command: str) -> dict:
+    """Build a raw update for a bot command sent in a private chat."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+            "text": command,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+        },
+    }
+
+def callback_update(update_id: int, user_id: int, data: str, message_id: int = 1) -> dict:
+    """Build a raw update for an inline button press on a bot message."""
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": BOT_USER,
+                "text": "verify",
+            },
+        },
+    }
@@ -1,17 +1,45 @@
+import asyncio
 import logging
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters
-from config import BOT_TOKEN, LOG_LEVEL
+import secrets
+from typing import Callable, Optional, Sequence
+from telegram import Update
+from telegram.ext import (
+    Application, CommandHandler, CallbackQueryHandler, ChatMemberHandler, MessageHandler,
+    TypeHandler, filters
+)
+from config import (
+    BOT_TOKEN, MEMBERSHIP_INDEX_ENABLED, CHANNELS_CONFIG_PATH, CHANNELS_CONFIG_POLL_INTERVAL,
+    RATE_LIMIT_OVERALL, RATE_LIMIT_PER_CHAT, RATE_LIMIT_PER_CHAT_BURST,
+    RATE_LIMIT_GROUP_PER_MINUTE, RATE_LIMIT_MAX_RETRIES, BOT_MODE, BOT_API_BASE_URL,
+    WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_URL, WEBHOOK_SECRET_TOKEN,
+    METRICS_LISTEN, METRICS_PORT, REVERIFY_INTERVAL, HTTP_POOL_SIZE, HTTP_UPDATES_POOL_SIZE,
+    CONCURRENT_UPDATES, WARM_START_PATH
+)
 from handlers import (
     start_command, help_command, verify_command, verify_callback, force_verify_callback,
-    unknown_command, error_handler
+    track_chat_member, unknown_command, error_handler, observe_update_lag, throttle_user,
+    membership_flights, verify_message_flights
 )
-from utils import validate_bot_permissions
-
-# Configure logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=getattr(logging, LOG_LEVEL.upper())
+from http_transport import build_request
+from membership_cache import membership_cache
+from metrics import MetricsServer, registry
+from log_setup import configure_logging
+from circuit_breaker import STATE_VALUES, channel_breakers
+from channel_config import ChannelConfig, ConfigWatcher, add_reload_listener, current_config
+from membership_index import (
+    MembershipIndex, build_membership_index, get_membership_index, install_membership_index
 )
+from overload import overload_controller
+from rate_limiter import PriorityRateLimiter
+from reverification import reverification_sweep
+from tracing import tracer
+from update_processor import PerUserUpdateProcessor
+from user_throttle import user_throttle
+from verified_store import verified_store
+from warm_start import WarmStartBot, load_snapshot, save_snapshot, seed_channel_registry
+from utils import validate_bot_permissions, channel_registry
+from preflight import run_preflight
+
 logger = logging.getLogger(__name__)
 
 class TelegramVerificationBot:
@@ -21,11 +49,26 @@ class TelegramVerificationBot:
         """Initialize the bot with the given token."""
         self.token = token
         self.application = None
+        self.metrics_port = METRICS_PORT
+        self.metrics_server = None
+        self.config_watcher: Optional[ConfigWatcher] = None
+        self.warm_snapshot: Optional[dict] = None
+        self.warm_refresh: Optional[asyncio.Task] = None
+        # Periodic jobs such as the re-verification sweep; sharded workers run them on one worker only
+        self.run_background_jobs = True
+        # Share of the global Bot API limits this process may use; sharded workers split them
+        self.rate_limit_share = 1.0
     
     def setup_handlers(self) -> None:
         """Set up all command and callback handlers."""
         app = self.application
         
+        # Runs before all other handlers to measure update lag
+        app.add_handler(TypeHandler(Update, observe_update_lag), group=-2)
+        
+        # Per-user throttle; stops further handling of throttled updates
+        app.add_handler(TypeHandler(Update, throttle_user), group=-1)
+        
         # Command handlers
         app.add_handler(CommandHandler("start", start_command))
         app.add_handler(CommandHandler("help", help_command))
@@ -35,6 +78,10 @@ class TelegramVerificationBot:
         app.add_handler(CallbackQueryHandler(verify_callback, pattern="verify"))
         app.add_handler(CallbackQueryHandler(force_verify_callback, pattern="force_verify"))
         
+        # Membership index updates (opt-in)
+        if MEMBERSHIP_INDEX_ENABLED:
+            app.add_handler(ChatMemberHandler(track_chat_member, ChatMemberHandler.CHAT_MEMBER))
+        
         # Unknown command handler (should be last)
         app.add_handler(MessageHandler(filters.COMMAND, unknown_command))
         
@@ -46,13 +93,295 @@ class TelegramVerificationBot:
     async def post_init(self, application: Application) -> None:
         """Post initialization hook."""
         bot = application.bot
-        bot_info = await bot.get_me()
-        logger.info(f"Bot initialized: @{bot_info.username} ({bot_info.first_name})")
+        # Application.initialize() already fetched (or restored) the bot's identity
+        source = "warm-start snapshot" if bot.identity_from_snapshot else "getMe"
+        logger.info(f"Bot initialized: @{bot.username} ({bot.first_name}) from {source}")
         
         # Validate bot permissions
         issues = validate_bot_permissions(bot)
         if issues:
             logger.warning(f"Bot configuration issues: {', '.join(issues)}")
+        
+        channels = current_config().channels
+        snapshot = self.warm_snapshot
+        if snapshot and self.snapshot_covers(snapshot, channels):
+            # Serve right away with the saved channel metadata and refresh it in the background
+            seeded = seed_channel_registry(snapshot)
+            logger.info(f"Warm start: restored {seeded} channels from {WARM_START_PATH}")
+            self.setup_membership_index(get_membership_index(), channels)
+            self.warm_refresh = asyncio.create_task(self.refresh_warm_start(bot, channels))
+        else:
+            # Resolve channel IDs and admin rights before serving users
+            await run_preflight(bot, channels)
+            self.setup_membership_index(get_membership_index(), channels)
+            save_snapshot(self.token, bot.bot, channel_registry)
+        
+        await verified_store.start()
+        tracer.start()
+        
+        if REVERIFY_INTERVAL > 0 and self.run_background_jobs:
+            if verified_store.started:
+                reverification_sweep.schedule(application)
+            else:
+                logger.warning("Re-verification sweep needs the verified-user store (VERIFIED_STORE_PATH)")
+        
+        if CHANNELS_CONFIG_PATH:
+            add_reload_listener(lambda config: self.on_config_reload(bot, config))
+            self.config_watcher = ConfigWatcher(CHANNELS_CONFIG_PATH, CHANNELS_CONFIG_POLL_INTERVAL)
+            self.config_watcher.start()
+        
+        self.register_runtime_metrics(application)
+        self.metrics_server = MetricsServer(METRICS_LISTEN, self.metrics_port)
+        try:
+            await self.metrics_server.start()
+        except OSError as e:
+            logger.warning(f"Could not start metrics server on port {self.metrics_port}: {e}")
+    
+    async def post_shutdown(self, application: Application) -> None:
+        """Post shutdown hook."""
+        if self.warm_refresh and not self.warm_refresh.done():
+            self.warm_refresh.cancel()
+        if self.config_watcher:
+            await self.config_watcher.stop()
+        if self.metrics_server:
+            await self.metrics_server.stop()
+        await verified_store.stop()
+        tracer.stop()
+    
+    def register_runtime_metrics(self, application: Application) -> None:
+        """Expose queue depths, cache counters and rate limiter totals, read at scrape time."""
+        rate_limiter = application.bot.rate_limiter
+        api_request = application.bot.request
+        update_processor = application.update_processor
+        registry.gauge(
+            "bot_update_queue_depth", "Updates received but not yet picked up for processing",
+            callback=lambda: application.update_queue.qsize()
+        )
+        if isinstance(update_processor, PerUserUpdateProcessor):
+            registry.gauge(
+                "bot_update_processor_updates", "Updates holding a slot, by state",
+                ["state"],
+                callback=lambda: {
+                    ("processing",): update_processor.running,
+                    ("waiting_for_user",): update_processor.waiting_for_user,
+                }
+            )
+        registry.gauge(
+            "bot_http_pool_connections", "Bot API connections in use and requests waiting for one",
+            ["state"],
+            callback=lambda: {("in_use",): api_request.in_use, ("waiting",): api_request.waiting}
+        )
+        registry.gauge(
+            "bot_api_queue_depth", "Bot API requests waiting for a rate limit token",
+            callback=lambda: rate_limiter.queue_depth
+        )
+        registry.counter(
+            "bot_api_queue_wait_seconds_total", "Total time requests waited in the rate limiter",
+            ["priority"],
+            callback=lambda: {(str(p),): total for p, total in rate_limiter.wait_total.items()}
+        )
+        registry.counter(
+            "bot_api_retry_after_total", "RetryAfter responses received from Telegram",
+            callback=lambda: rate_limiter.retry_after_count
+        )
+        registry.gauge(
+            "bot_membership_cache_size", "Entries in the membership cache",
+            callback=lambda: len(membership_cache)
+        )
+        registry.counter(
+            "bot_membership_cache_hits_total", "Membership lookups answered by the cache",
+            callback=lambda: membership_cache.hits
+        )
+        registry.counter(
+            "bot_membership_cache_misses_total", "Membership lookups the cache could not answer",
+            callback=lambda: membership_cache.misses
+        )
+        registry.counter(
+            "bot_membership_cache_evictions_total", "Entries evicted to keep the membership cache within its size",
+            callback=lambda: membership_cache.evictions
+        )
+        registry.gauge(
+            "bot_channel_breaker_state", "Circuit breaker state per channel (0 closed, 1 open, 2 half-open)",
+            ["channel"],
+            callback=lambda: {
+                (channel,): STATE_VALUES[state] for channel, state in channel_breakers.states().items()
+            }
+        )
+        registry.counter(
+            "bot_channel_breaker_skipped_total", "getChatMember calls skipped by an open circuit breaker",
+            ["channel"],
+            callback=lambda: {(channel,): count for channel, count in channel_breakers.skipped().items()}
+        )
+        registry.gauge(
+            "bot_throttle_users", "Users tracked by the per-user throttle",
+            callback=lambda: len(user_throttle)
+        )
+        registry.gauge(
+            "bot_overload_level",
+            "Verification degradation level (0 normal, 1 cached only, 2 no placeholder, 3 manual, 4 busy)",
+            callback=lambda: overload_controller.current_level
+        )
+        registry.gauge(
+            "bot_overload_update_lag_seconds", "Smoothed update lag the overload controller acts on",
+            callback=lambda: overload_controller.lag
+        )
+        registry.gauge(
+            "bot_verifications_in_flight", "Membership checks and verify callbacks currently running",
+            ["kind"],
+            callback=lambda: {
+                ("membership",): len(membership_flights),
+                ("callback",): len(verify_message_flights),
+            }
+        )
+    
+    def snapshot_covers(self, snapshot: dict, channels: Sequence[dict]) -> bool:
+        """Whether a warm-start snapshot has metadata for every configured channel."""
+        saved = snapshot.get("channels", {})
+        return all(channel['username'].lower() in saved for channel in channels)
+    
+    async def refresh_warm_start(self, bot, channels: Sequence[dict]) -> None:
+        """
+        Re-check what a warm start restored and save a fresh snapshot.
+        
+        Args:
+            bot: The Telegram bot instance
+            channels: Channels restored from the snapshot
+        """
+        try:
+            await run_preflight(bot, channels)
+            self.setup_membership_index(get_membership_index(), channels)
+            if bot.identity_from_snapshot:
+                await bot.get_me()
+            save_snapshot(self.token, bot.bot, channel_registry)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Warm-start refresh failed, keeping restored data: {e}")
+    
+    async def on_config_reload(self, bot, config: ChannelConfig) -> Callable[[], None]:
+        """
+        Resolve a reloaded channel list before it becomes active.
+        
+        Args:
+            bot: The Telegram bot instance
+            config: The new configuration snapshot
+        
+        Returns:
+            Callable[[], None]: Installs the membership index for the new channels
+        """
+        await run_preflight(bot, config.channels)
+        
+        index = get_membership_index()
+        if MEMBERSHIP_INDEX_ENABLED:
+            # Keep what the index has learned unless the channel bit order changed
+            if index is None or index.usernames != tuple(username.lower() for username in config.usernames):
+                index = build_membership_index(config.usernames)
+            self.setup_membership_index(index, config.channels)
+        
+        return lambda: install_membership_index(index)
+    
+    def setup_membership_index(self, membership_index: Optional[MembershipIndex],
+                               channels: Sequence[dict]) -> None:
+        """
+        Mark channels where the bot is admin as observable via chat_member updates.
+        
+        Args:
+            membership_index: Index to configure; nothing to do if indexing is off
+            channels: Channels the index was built for
+        """
+        if membership_index is None:
+            return
+        usernames = [channel['username'] for channel in channels]
+        for username in usernames:
+            info = channel_registry.get(username.lower())
+            membership_index.set_observable(username, info is not None and info.can_verify)
+        
+        observable = membership_index.observable_channels()
+        logger.info(
+            f"Membership index observing {len(observable)}/{len(usernames)} channels; "
+            f"polling the rest"
+        )
+    
+    def allowed_updates(self) -> list:
+        """Get the update types the bot subscribes to."""
+        updates = ["message", "callback_query"]
+        if MEMBERSHIP_INDEX_ENABLED:
+            updates.append("chat_member")
+        return updates
+    
+    def create_rate_limiter(self) -> PriorityRateLimiter:
+        """
+        Create the shared Bot API scheduler from configuration.
+        
+        The overall and group limits are scaled by rate_limit_share. Per-chat
+        limits are not, because each private chat is served by one worker.
+        """
+        return PriorityRateLimiter(
+            overall_rate=RATE_LIMIT_OVERALL * self.rate_limit_share,
+            per_chat_rate=RATE_LIMIT_PER_CHAT,
+            per_chat_burst=RATE_LIMIT_PER_CHAT_BURST,
+            group_rate=RATE_LIMIT_GROUP_PER_MINUTE / 60 * self.rate_limit_share,
+            max_retries=RATE_LIMIT_MAX_RETRIES
+        )
+    
+    def build_application(self, with_updater: bool = True) -> Application:
+        """
+        Create the application and register all handlers.
+        
+        Args:
+            with_updater: False for sharded workers, which receive updates from the router
+        """
+        self.warm_snapshot = load_snapshot(self.token)
+        bot = WarmStartBot(
+            self.token,
+            base_url=BOT_API_BASE_URL,
+            request=build_request("api", HTTP_POOL_SIZE),
+            get_updates_request=build_request("updates", HTTP_UPDATES_POOL_SIZE) if with_updater else None,
+            rate_limiter=self.create_rate_limiter(),
+            cached_identity=self.warm_snapshot["bot"] if self.warm_snapshot else None
+        )
+        builder = (
+            Application.builder()
+            .bot(bot)
+            .post_init(self.post_init)
+            .post_shutdown(self.post_shutdown)
+        )
+        if CONCURRENT_UPDATES > 0:
+            builder = builder.concurrent_updates(PerUserUpdateProcessor(CONCURRENT_UPDATES))
+        if not with_updater:
+            builder = builder.updater(None)
+        self.application = builder.build()
+        self.setup_handlers()
+        return self.application
+    
+    def run_polling(self) -> None:
+        """Serve updates by long-polling getUpdates."""
+        logger.info("Starting bot in polling mode...")
+        self.application.run_polling(
+            allowed_updates=self.allowed_updates(),
+            drop_pending_updates=True
+        )
+    
+    def run_webhook(self) -> None:
+        """Serve updates from a local HTTP server that Telegram posts to."""
+        if not WEBHOOK_URL:
+            raise ValueError("WEBHOOK_URL must be set when BOT_MODE=webhook")
+        
+        secret_token = WEBHOOK_SECRET_TOKEN
+        if not secret_token:
+            secret_token = secrets.token_urlsafe(32)
+            logger.info("WEBHOOK_SECRET_TOKEN not set, generated a random secret for this run")
+        
+        logger.info(f"Starting bot in webhook mode on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH}...")
+        self.application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=WEBHOOK_URL,
+            secret_token=secret_token,
+            allowed_updates=self.allowed_updates(),
+            drop_pending_updates=True
+        )
     
     def run(self) -> None:
         """Run the bot."""
@@ -61,19 +390,14 @@ class TelegramVerificationBot:
             return
         
         try:
-            # Create application
-            self.application = Application.builder().token(self.token).post_init(self.post_init).build()
-            
-            # Setup handlers
-            self.setup_handlers()
+            self.build_application()
             
-            logger.info("Starting bot...")
-            
-            # Start the bot
-            self.application.run_polling(
-                allowed_updates=["message", "callback_query"],
-                drop_pending_updates=True
-            )
+            if BOT_MODE == "webhook":
+                self.run_webhook()
+            elif BOT_MODE == "polling":
+                self.run_polling()
+            else:
+                raise ValueError(f"Unknown BOT_MODE '{BOT_MODE}', expected 'polling' or 'webhook'")
             
         except Exception as e:
             logger.error(f"Failed to start bot: {str(e)}")
@@ -90,6 +414,7 @@ def create_bot() -> TelegramVerificationBot:
     return TelegramVerificationBot(BOT_TOKEN)
 
 if __name__ == "__main__":
+    configure_logging()
     bot = create_bot()
     try:
         bot.run()
@@ -0,0 +1,245 @@
+import asyncio
+import json
+import logging
+import os
+from types import MappingProxyType
+from typing import Awaitable, Callable, List, Mapping, Optional, Tuple
+from config import (
+    REQUIRED_CHANNELS, EXCLUSIVE_CHANNEL, MESSAGES, CHANNELS_CONFIG_PATH
+)
+
+logger = logging.getLogger(__name__)
+
+# Number of positional placeholders each message template must accept
+_TEMPLATE_ARITY = {
+    "welcome": 1,
+    "not_member": 2,
+    "no_membership": 1,
+    "partial_verification": 3,
+    "verification_complete": 1,
+    "verification_progress": 3,
+}
+
+class ConfigError(ValueError):
+    """Raised when a channel configuration file is invalid."""
+
+class ChannelConfig:
+    """Immutable, validated snapshot of channels, exclusive link and messages."""
+    
+    __slots__ = ("channels", "exclusive_channel", "messages", "version")
+    
+    def __init__(self, channels: List[dict], exclusive_channel: dict, messages: Mapping[str, str],
+                 version: int = 0):
+        object.__setattr__(self, "channels", tuple(MappingProxyType(dict(c)) for c in channels))
+        object.__setattr__(self, "exclusive_channel", MappingProxyType(dict(exclusive_channel)))
+        object.__setattr__(self, "messages", MappingProxyType(dict(messages)))
+        object.__setattr__(self, "version", version)
+    
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError("ChannelConfig is immutable")
+    
+    @property
+    def usernames(self) -> Tuple[str, ...]:
+        """Usernames of the required channels, in order."""
+        return tuple(channel['username'] for channel in self.channels)
+
+def validate_config(data: dict, version: int = 0) -> ChannelConfig:
+    """
+    Validate raw configuration data and build a snapshot.
+    
+    Args:
+        data: Parsed JSON with "required_channels", "exclusive_channel" and
+            optional "messages" overrides (missing messages keep their defaults)
+        version: Version number to stamp on the snapshot
+    
+    Returns:
+        ChannelConfig: The validated snapshot
+    
+    Raises:
+        ConfigError: If any part of the configuration is missing or malformed
+    """
+    if not isinstance(data, dict):
+        raise ConfigError("configuration must be a JSON object")
+    
+    channels = data.get("required_channels")
+    if not isinstance(channels, list) or not channels:
+        raise ConfigError("'required_channels' must be a non-empty list")
+    
+    seen = set()
+    for i, channel in enumerate(channels):
+        if not isinstance(channel, dict):
+            raise ConfigError(f"required_channels[{i}] must be an object")
+        for key in ("name", "username", "url"):
+            if not isinstance(channel.get(key), str) or not channel[key].strip():
+                raise ConfigError(f"required_channels[{i}] is missing '{key}'")
+        username = channel["username"].lstrip("@").lower()
+        if username in seen:
+            raise ConfigError(f"channel @{username} is listed twice")
+        seen.add(username)
+    
+    exclusive_channel = data.get("exclusive_channel")
+    if not isinstance(exclusive_channel, dict) or not all(
+        isinstance(exclusive_channel.get(key), str) and exclusive_channel[key] for key in ("name", "url")
+    ):
+        raise ConfigError("'exclusive_channel' must have 'name' and 'url'")
+    
+    overrides = data.get("messages", {})
+    if not isinstance(overrides, dict) or not all(isinstance(v, str) for v in overrides.values()):
+        raise ConfigError("'messages' must map message names to strings")
+    messages = dict(MESSAGES)
+    messages.update(overrides)
+    
+    for name, arity in _TEMPLATE_ARITY.items():
+        try:
+            messages[name].format(*(["x"] * arity))
+        except (IndexError, KeyError, ValueError) as e:
+            raise ConfigError(f"message '{name}' must take {arity} placeholder(s): {e}")
+    
+    channels = [dict(channel, username=channel["username"].lstrip("@")) for channel in channels]
+    return ChannelConfig(channels, exclusive_channel, messages, version)
+
+def load_config_file(path: str, version: int = 0) -> ChannelConfig:
+    """
+    Read and validate a channel configuration file.
+    
+    Args:
+        path: Path to the JSON file
+        version: Version number to stamp on the snapshot
+    
+    Returns:
+        ChannelConfig: The validated snapshot
+    
+    Raises:
+        ConfigError: If the file cannot be read or is invalid
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ConfigError(f"cannot read {path}: {e}")
+    return validate_config(data, version)
+
+def _initial_config() -> ChannelConfig:
+    defaults = ChannelConfig(REQUIRED_CHANNELS, EXCLUSIVE_CHANNEL, MESSAGES)
+    if not CHANNELS_CONFIG_PATH:
+        return defaults
+    try:
+        return load_config_file(CHANNELS_CONFIG_PATH)
+    except ConfigError as e:
+        logger.error("Invalid channel configuration, using built-in defaults: %s", e)
+        return defaults
+
+_current = _initial_config()
+
+def current_config() -> ChannelConfig:
+    """Get the active channel configuration snapshot."""
+    return _current
+
+ReloadListener = Callable[[ChannelConfig], Awaitable[Callable[[], None]]]
+_listeners: List[ReloadListener] = []
+
+def add_reload_listener(listener: ReloadListener) -> None:
+    """
+    Register a coroutine that prepares derived data for a new snapshot.
+    
+    The listener receives the new snapshot while the old one is still active
+    and returns a zero-argument function that installs its prepared data. All
+    install functions run together, right when the snapshot is swapped, so
+    handlers never see derived data from two different snapshots.
+    
+    Args:
+        listener: Async function taking the new ChannelConfig and returning an installer
+    """
+    _listeners.append(listener)
+
+async def apply_config(new_config: ChannelConfig) -> None:
+    """
+    Rebuild derived data for a snapshot and make it active.
+    
+    Args:
+        new_config: The validated snapshot to activate
+    """
+    global _current
+    installers = [await listener(new_config) for listener in _listeners]
+    
+    # Swap everything without yielding to the event loop
+    _current = new_config
+    for install in installers:
+        install()
+    logger.info(
+        "Channel configuration v%s active (%s channels)", new_config.version, len(new_config.channels)
+    )
+
+class ConfigWatcher:
+    """Poll the configuration file and hot-reload it when it changes."""
+    
+    def __init__(self, path: str, interval: float):
+        """
+        Initialize the watcher.
+        
+        Args:
+            path: JSON configuration file to watch
+            interval: Seconds between checks
+        """
+        self.path = path
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._signature = self._stat()
+        self.reloads = 0
+        self.failures = 0
+    
+    def _stat(self) -> Optional[Tuple[float, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size
+    
+    def start(self) -> None:
+        """Start watching in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+            logger.info("Watching %s for channel configuration changes", self.path)
+    
+    async def stop(self) -> None:
+        """Stop watching."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def check(self) -> bool:
+        """
+        Reload the file if it changed since the last check.
+        
+        Returns:
+            bool: True if a new configuration was activated
+        """
+        signature = await asyncio.to_thread(self._stat)
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        
+        try:
+            new_config = await asyncio.to_thread(
+                load_config_file, self.path, current_config().version + 1
+            )
+        except ConfigError as e:
+            self.failures += 1
+            logger.error("Ignoring invalid channel configuration: %s", e)
+            return False
+        
+        await apply_config(new_config)
+        self.reloads += 1
+        return True
+    
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Channel configuration reload failed")
@@ -0,0 +1,156 @@
+import logging
+import time
+from typing import Callable, Dict
+from config import BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN
+
+logger = logging.getLogger(__name__)
+
+# Breaker states, in the order they are reported as gauge values
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+STATE_VALUES = {STATE_CLOSED: 0, STATE_OPEN: 1, STATE_HALF_OPEN: 2}
+
+class CircuitBreaker:
+    """
+    Stops calling the API for a channel whose member list can't be read.
+    
+    Closed: calls go through and privacy/permission failures are counted.
+    Open: calls are skipped until the cooldown ends.
+    Half-open: a single probe call is allowed. If it succeeds the breaker
+    closes; if it fails the breaker opens for another cooldown.
+    """
+    
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 cooldown: float = BREAKER_COOLDOWN, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the breaker.
+        
+        Args:
+            name: Name used in log messages (the channel username)
+            failure_threshold: Consecutive failures that open the breaker
+            cooldown: Seconds to stay open before probing
+            clock: Monotonic time source
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self._clock = clock
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.skipped = 0
+        self.trips = 0
+        self._probing = False
+        self._probe_started = 0.0
+    
+    def allow(self) -> bool:
+        """
+        Check whether an API call may be made now.
+        
+        Returns:
+            bool: True if the call should go ahead; False if it should be skipped
+        """
+        if self.state == STATE_CLOSED:
+            return True
+        
+        now = self._clock()
+        if self.state == STATE_OPEN and now - self.opened_at >= self.cooldown:
+            self.state = STATE_HALF_OPEN
+            logger.info("Circuit breaker for @%s half-open, probing", self.name)
+        
+        # A probe that never reported back (e.g. cancelled) is replaced after a cooldown
+        if self.state == STATE_HALF_OPEN and (
+            not self._probing or now - self._probe_started >= self.cooldown
+        ):
+            self._probing = True
+            self._probe_started = now
+            return True
+        
+        self.skipped += 1
+        return False
+    
+    def record_success(self) -> None:
+        """Record a call that proved the member list is readable."""
+        self._probing = False
+        self.failures = 0
+        if self.state != STATE_CLOSED:
+            self.state = STATE_CLOSED
+            logger.info("Circuit breaker for @%s closed, membership checks resumed", self.name)
+    
+    def record_failure(self) -> None:
+        """Record a privacy or permission failure."""
+        self._probing = False
+        self.failures += 1
+        if self.state == STATE_HALF_OPEN or (
+            self.state == STATE_CLOSED and self.failures >= self.failure_threshold
+        ):
+            self.trip()
+    
+    def record_inconclusive(self) -> None:
+        """
+        Record a call that failed for unrelated reasons, e.g. a timeout.
+        
+        Such failures don't count towards opening the breaker, but a probe
+        that failed proved nothing, so a half-open breaker opens again rather
+        than probing on every request.
+        """
+        self._probing = False
+        if self.state == STATE_HALF_OPEN:
+            self.trip()
+    
+    def trip(self) -> None:
+        """Open the breaker now, e.g. when preflight finds the bot isn't an admin."""
+        self._probing = False
+        self.opened_at = self._clock()
+        self.trips += 1
+        if self.state != STATE_OPEN:
+            self.state = STATE_OPEN
+            logger.warning(
+                "Circuit breaker for @%s open after %s failure(s); skipping checks for %ss",
+                self.name, self.failures, self.cooldown
+            )
+
+class BreakerRegistry:
+    """One circuit breaker per channel, created on first use."""
+    
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 cooldown: float = BREAKER_COOLDOWN):
+        """
+        Initialize the registry.
+        
+        Args:
+            failure_threshold: Consecutive failures that open a breaker
+            cooldown: Seconds a breaker stays open before probing
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._breakers: Dict[str, CircuitBreaker] = {}
+    
+    def get(self, channel_username: str) -> CircuitBreaker:
+        """
+        Get the breaker for a channel.
+        
+        Args:
+            channel_username: Username of the channel
+        
+        Returns:
+            CircuitBreaker: The channel's breaker
+        """
+        key = channel_username.lower()
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(channel_username, self.failure_threshold, self.cooldown)
+            self._breakers[key] = breaker
+        return breaker
+    
+    def states(self) -> Dict[str, str]:
+        """Get the state of every breaker, keyed by channel username."""
+        return {breaker.name: breaker.state for breaker in self._breakers.values()}
+    
+    def skipped(self) -> Dict[str, int]:
+        """Get the number of skipped API calls per channel."""
+        return {breaker.name: breaker.skipped for breaker in self._breakers.values()}
+
+# Shared breakers for the required channels
+channel_breakers = BreakerRegistry()
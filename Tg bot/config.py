@@ -54,6 +54,14 @@ Please join this channel first:
 After joining, click the 🔍 Check Again button below to verify your status.
 """,
     
+    "no_membership": """🚫 ACCESS DENIED 🚫
+
+🔥 Join All Channels First:
+
+{}
+
+⚡ Then click 'Verify Again' for premium access!""",
+    
     "partial_verification": """
 📊 PROGRESS: {}/{} Channels Joined ✨
 
@@ -90,6 +98,33 @@ After joining, click the 🔍 Check Again button below to verify your status.
 Click the GREEN button below to get instant access!
 """,
     
+    "verification_unknown": """
+⏳ <b>Telegram is responding slowly right now.</b>
+
+We couldn't confirm your membership in time. This doesn't mean you haven't joined.
+
+Please tap "🔍 Verify Again" in a few seconds.
+""",
+    
+    "verification_progress": """
+⏳ <b>Still checking some channels...</b>
+
+✅ <b>Confirmed joined:</b>
+{}
+
+❌ <b>Not joined yet:</b>
+{}
+
+🔄 <b>Still checking:</b>
+{}
+
+Join any missing channels, then tap "🔍 Verify Again" - it will be much faster now.
+""",
+    
+    "throttled": "⏳ Too many requests. Please wait a few seconds and try again.",
+    
+    "busy": "⏳ The bot is very busy right now. Please try verifying again in a minute.",
+    
     "help": """
 🤖 *Bot Commands:*
 
@@ -109,3 +144,172 @@ Click the GREEN button below to get instant access!
 
 # Logging configuration
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# "text" or "json" (one JSON object per line)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Optional log file; logs go to stderr when empty
+LOG_FILE = os.getenv("LOG_FILE", "")
+# Records per second allowed for each distinct log event (0 disables rate limiting)
+LOG_RATE_LIMIT_PER_EVENT = float(os.getenv("LOG_RATE_LIMIT_PER_EVENT", "20"))
+# Fraction of DEBUG/INFO records kept (1.0 keeps all)
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+
+# Tracing: per-verification spans written as JSON lines to a rotating file (empty disables).
+# Summarize with: python trace_report.py traces.jsonl
+TRACE_PATH = os.getenv("TRACE_PATH", "")
+# Fraction of traces kept, plus every trace slower than TRACE_SLOW_THRESHOLD seconds (0 disables)
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_SLOW_THRESHOLD = float(os.getenv("TRACE_SLOW_THRESHOLD", "2"))
+# Rotate at this size, keeping this many old files
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_BACKUP_COUNT = int(os.getenv("TRACE_BACKUP_COUNT", "5"))
+
+# Membership check settings
+# Maximum number of get_chat_member calls in flight for a single verification
+MEMBERSHIP_CHECK_CONCURRENCY = int(os.getenv("MEMBERSHIP_CHECK_CONCURRENCY", "5"))
+# Seconds to wait for a single channel lookup before treating it as failed
+MEMBERSHIP_CHECK_TIMEOUT = float(os.getenv("MEMBERSHIP_CHECK_TIMEOUT", "10"))
+# Overall seconds a verification may spend on lookups, retries included; channels still
+# unresolved after that are reported as unknown rather than not joined
+MEMBERSHIP_CHECK_DEADLINE = float(os.getenv("MEMBERSHIP_CHECK_DEADLINE", "15"))
+# Attempts per channel for timeouts, network errors and flood waits
+MEMBERSHIP_RETRY_ATTEMPTS = int(os.getenv("MEMBERSHIP_RETRY_ATTEMPTS", "3"))
+# Exponential backoff between attempts: base delay, doubled per attempt, capped, with full jitter
+MEMBERSHIP_RETRY_BASE_DELAY = float(os.getenv("MEMBERSHIP_RETRY_BASE_DELAY", "0.25"))
+MEMBERSHIP_RETRY_MAX_DELAY = float(os.getenv("MEMBERSHIP_RETRY_MAX_DELAY", "2"))
+# Seconds a verification waits before replying with whatever results are in; lookups still
+# running keep going in the background to warm the cache (0 waits for every channel)
+MEMBERSHIP_RESPONSE_BUDGET = float(os.getenv("MEMBERSHIP_RESPONSE_BUDGET", "0"))
+
+# Concurrent update processing: number of updates handled at once (0 handles one at a time).
+# Each user's updates are still processed strictly in order.
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "0"))
+
+# Per-user throttle for commands and button presses
+# Requests per second a user may sustain (0 disables), and how many may come back to back
+USER_THROTTLE_RATE = float(os.getenv("USER_THROTTLE_RATE", "0.2"))
+USER_THROTTLE_BURST = float(os.getenv("USER_THROTTLE_BURST", "5"))
+# Maximum users tracked; the least recently seen are forgotten first
+USER_THROTTLE_MAX_USERS = int(os.getenv("USER_THROTTLE_MAX_USERS", "100000"))
+
+# Verify button: answer the callback while checking, and show the "checking" placeholder only
+# if the result isn't ready within VERIFY_PLACEHOLDER_DELAY seconds
+OPTIMISTIC_RENDERING = os.getenv("OPTIMISTIC_RENDERING", "false").lower() in ("1", "true", "yes")
+VERIFY_PLACEHOLDER_DELAY = float(os.getenv("VERIFY_PLACEHOLDER_DELAY", "0.5"))
+
+# Load shedding: degrade verification step by step while the bot is falling behind.
+# Levels: 1 cached results only, 2 also no "checking" edit, 3 manual path, 4 "busy" reply.
+# Comma-separated thresholds for levels 1-4 (fewer values use fewer levels; empty disables)
+# Smoothed update lag in seconds
+OVERLOAD_LAG_THRESHOLDS = [float(v) for v in os.getenv("OVERLOAD_LAG_THRESHOLDS", "5,10,20,40").split(",") if v.strip()]
+# Membership checks running at once
+OVERLOAD_INFLIGHT_THRESHOLDS = [int(v) for v in os.getenv("OVERLOAD_INFLIGHT_THRESHOLDS", "200,400,800,1600").split(",") if v.strip()]
+# Seconds for the lag estimate to halve once updates are on time again
+OVERLOAD_LAG_HALF_LIFE = float(os.getenv("OVERLOAD_LAG_HALF_LIFE", "5"))
+# Minimum seconds between steps back down
+OVERLOAD_HOLD = float(os.getenv("OVERLOAD_HOLD", "10"))
+
+# Membership cache settings
+# Maximum number of (user, channel) results kept in memory
+MEMBERSHIP_CACHE_SIZE = int(os.getenv("MEMBERSHIP_CACHE_SIZE", "100000"))
+# Seconds a positive ("member") result is trusted
+MEMBERSHIP_CACHE_POSITIVE_TTL = float(os.getenv("MEMBERSHIP_CACHE_POSITIVE_TTL", "300"))
+# Seconds a negative ("not member") result is trusted; keep short so users who just joined aren't stuck
+MEMBERSHIP_CACHE_NEGATIVE_TTL = float(os.getenv("MEMBERSHIP_CACHE_NEGATIVE_TTL", "5"))
+
+# Push-based membership index
+# Subscribe to chat_member updates and answer membership from memory for channels where the bot is admin
+MEMBERSHIP_INDEX_ENABLED = os.getenv("MEMBERSHIP_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Bot API rate limiting
+# Requests per second across all chats
+RATE_LIMIT_OVERALL = float(os.getenv("RATE_LIMIT_OVERALL", "30"))
+# Messages per second in a single private chat, and how many may be sent back to back
+RATE_LIMIT_PER_CHAT = float(os.getenv("RATE_LIMIT_PER_CHAT", "1"))
+RATE_LIMIT_PER_CHAT_BURST = float(os.getenv("RATE_LIMIT_PER_CHAT_BURST", "3"))
+# Messages per minute in a single group or channel
+RATE_LIMIT_GROUP_PER_MINUTE = float(os.getenv("RATE_LIMIT_GROUP_PER_MINUTE", "20"))
+# Retries after a RetryAfter (flood wait) before the error is raised
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3"))
+
+# Serving mode: "polling" (default) or "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+# Bot API endpoint; point at a local fake server for testing
+BOT_API_BASE_URL = os.getenv("BOT_API_BASE_URL", "https://api.telegram.org/bot")
+
+# Webhook settings (used when BOT_MODE=webhook)
+# Address and port the local HTTP server binds to
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+# Path the server accepts updates on
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+# Public URL Telegram (or the load balancer) posts updates to, e.g. https://example.com/telegram
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+# Secret checked against the X-Telegram-Bot-Api-Secret-Token header; generated at startup if empty
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN", "")
+
+# Multi-process sharding (run.py launcher)
+# Number of worker processes; updates are routed by user_id so each user stays on one worker
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "1"))
+# Seconds between worker health checks, and heartbeat age after which a worker is restarted
+SHARD_HEALTH_INTERVAL = float(os.getenv("SHARD_HEALTH_INTERVAL", "5"))
+SHARD_HEARTBEAT_TIMEOUT = float(os.getenv("SHARD_HEARTBEAT_TIMEOUT", "60"))
+# Maximum updates buffered per worker before the router waits
+SHARD_QUEUE_SIZE = int(os.getenv("SHARD_QUEUE_SIZE", "1000"))
+# Seconds a worker gets to take its stop request and to exit on shutdown before it is terminated
+SHARD_STOP_TIMEOUT = float(os.getenv("SHARD_STOP_TIMEOUT", "10"))
+
+# Persistent verified-user store
+# SQLite file recording verification outcomes; set to an empty string to disable
+VERIFIED_STORE_PATH = os.getenv("VERIFIED_STORE_PATH", "verified_users.db")
+# Seconds a successful automatic verification grants instant access without re-checking (0 disables)
+VERIFIED_VALIDITY_SECONDS = float(os.getenv("VERIFIED_VALIDITY_SECONDS", "3600"))
+# Write-behind batching: maximum records per transaction and seconds to wait for a batch to fill
+VERIFIED_STORE_BATCH_SIZE = int(os.getenv("VERIFIED_STORE_BATCH_SIZE", "100"))
+VERIFIED_STORE_FLUSH_INTERVAL = float(os.getenv("VERIFIED_STORE_FLUSH_INTERVAL", "1.0"))
+
+# Metrics endpoint (Prometheus text format at /metrics); set METRICS_PORT=0 to disable
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9102"))
+
+# Hot-reloadable channel configuration
+# Optional JSON file overriding REQUIRED_CHANNELS, EXCLUSIVE_CHANNEL and MESSAGES; watched for changes
+CHANNELS_CONFIG_PATH = os.getenv("CHANNELS_CONFIG_PATH", "")
+# Seconds between checks of the configuration file
+CHANNELS_CONFIG_POLL_INTERVAL = float(os.getenv("CHANNELS_CONFIG_POLL_INTERVAL", "5"))
+
+# Per-channel circuit breaker for channels whose member list can't be read
+# Consecutive privacy/permission failures before the breaker opens
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+# Seconds an open breaker skips API calls before letting one probe through
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "60"))
+
+# Background re-verification of users who were granted access
+# Seconds between the starts of full sweeps (0 disables the sweep)
+REVERIFY_INTERVAL = float(os.getenv("REVERIFY_INTERVAL", "0"))
+# Users re-checked per job run
+REVERIFY_BATCH_SIZE = int(os.getenv("REVERIFY_BATCH_SIZE", "20"))
+# Share of RATE_LIMIT_OVERALL the sweep may use on average
+REVERIFY_API_SHARE = float(os.getenv("REVERIFY_API_SHARE", "0.1"))
+# JSON Lines file each re-check result is appended to (empty disables the report)
+REVERIFY_REPORT_PATH = os.getenv("REVERIFY_REPORT_PATH", "reverification_report.jsonl")
+
+# HTTP transport to the Bot API; getUpdates and all other calls use separate connection pools
+# Maximum connections in each pool
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "256"))
+HTTP_UPDATES_POOL_SIZE = int(os.getenv("HTTP_UPDATES_POOL_SIZE", "1"))
+# Idle connections kept open per pool, and seconds an idle connection is kept
+HTTP_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_KEEPALIVE_CONNECTIONS", "64"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+# Timeouts in seconds; the pool timeout bounds the wait for a free connection
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "5"))
+HTTP_WRITE_TIMEOUT = float(os.getenv("HTTP_WRITE_TIMEOUT", "5"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "1"))
+# "1.1" or "2" (HTTP/2 needs: pip install "python-telegram-bot[http2]")
+HTTP_VERSION = os.getenv("HTTP_VERSION", "1.1")
+
+# Warm start: bot identity and resolved channels saved locally so restarts can serve right away
+# Snapshot file (empty disables)
+WARM_START_PATH = os.getenv("WARM_START_PATH", "warm_start.json")
+# Seconds after which a snapshot is ignored
+WARM_START_MAX_AGE = float(os.getenv("WARM_START_MAX_AGE", "86400"))
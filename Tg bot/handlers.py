@@ -1,333 +1,355 @@
+import asyncio
 import logging
-from typing import List
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes
+import time
+from typing import Optional
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes
 from telegram.constants import ParseMode
-from config import MESSAGES, REQUIRED_CHANNELS, EXCLUSIVE_CHANNEL
-from utils import check_user_membership, format_channel_list, format_remaining_channels
+from telegram.error import TelegramError
+from config import (
+    MEMBERSHIP_RESPONSE_BUDGET, OPTIMISTIC_RENDERING, VERIFY_PLACEHOLDER_DELAY
+)
+from utils import check_user_membership
+from circuit_breaker import channel_breakers
+from membership_cache import membership_cache
+from membership_index import get_membership_index
+from overload import (
+    LEVEL_BUSY, LEVEL_CACHED_ONLY, LEVEL_MANUAL, LEVEL_NAMES, LEVEL_NO_PLACEHOLDER, LEVEL_NORMAL,
+    overload_controller
+)
+from render_cache import RenderedScreen, get_render_cache
+from singleflight import SingleFlight
+from tracing import current_span, traced, tracer
+from user_throttle import user_throttle
+from verified_store import METHOD_AUTO, METHOD_MANUAL, verified_store
+from metrics import (
+    OVERLOAD_SHED, THROTTLED_UPDATES, THROTTLE_API_CALLS_AVOIDED, UPDATE_LAG, VERIFY_PLACEHOLDERS,
+    timed_handler
+)
 
 logger = logging.getLogger(__name__)
 
-async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle the /start command."""
-    user = update.effective_user
-    logger.info(f"User {user.id} ({user.username}) started the bot")
+# In-flight membership checks per user, and verify callbacks per message
+membership_flights = SingleFlight()
+verify_message_flights = SingleFlight()
+
+async def send_screen(update: Update, screen: RenderedScreen, is_callback: bool = False) -> None:
+    """Send a pre-built screen, editing the callback message or replying to the command."""
+    if is_callback:
+        with tracer.child_span("edit_message_text"):
+            await update.callback_query.edit_message_text(text=screen.text, **screen.kwargs)
+    else:
+        with tracer.child_span("send_message"):
+            await update.message.reply_text(screen.text, **screen.kwargs)
+
+@traced("answer_callback_query", root=False)
+async def _answer(update: Update, text: Optional[str] = None) -> None:
+    """Answer the update's callback query, stopping the client's spinner."""
+    await update.callback_query.answer(text)
+
+async def observe_update_lag(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Record how long a message waited between being sent and being handled."""
+    message = update.effective_message
+    if message and message.date and not update.callback_query:
+        lag = max(0.0, time.time() - message.date.timestamp())
+        UPDATE_LAG.observe(lag)
+        overload_controller.observe_lag(lag)
+
+def _overload_level() -> int:
+    """Get the degradation level for a new verification, counting it if degraded."""
+    level = overload_controller.level(len(membership_flights))
+    if level > LEVEL_NORMAL:
+        OVERLOAD_SHED.inc(level=LEVEL_NAMES[level])
+    return level
+
+def _estimated_api_calls(update: Update, channel_count: int) -> int:
+    """Estimate the Bot API calls handling an update would make."""
+    if update.callback_query:
+        if update.callback_query.data == "verify":
+            # answer, placeholder and result edits, plus one lookup per channel
+            return channel_count + 3
+        return 2
+    if update.message.text.split()[0].split("@")[0] == "/verify":
+        return channel_count + 1
+    return 1
+
+async def throttle_user(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Stop commands and button presses from users over their request budget.
     
-    # Format the required channels list
-    channels_text = format_channel_list(REQUIRED_CHANNELS)
-    welcome_message = MESSAGES["welcome"].format(channels_text)
+    Runs before all other handlers. A throttled button press is answered
+    right away so the client stops its spinner; a throttled command gets the
+    cached notice once, after which further commands are dropped silently
+    until the user's budget recovers.
+    """
+    if not user_throttle.enabled or update.effective_user is None:
+        return
+    query = update.callback_query
+    if query is None and not (update.message and update.message.text and update.message.text.startswith("/")):
+        return
     
-    # Create inline keyboard with verify button
-    keyboard = [[InlineKeyboardButton("🔍 Verify Membership", callback_data="verify")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    allowed, notify = user_throttle.check(update.effective_user.id)
+    if allowed:
+        return
     
-    await update.message.reply_text(
-        welcome_message,
-        parse_mode=ParseMode.HTML,
-        reply_markup=reply_markup,
-        disable_web_page_preview=True
+    screens = get_render_cache()
+    kind = "callback" if query else "command"
+    THROTTLED_UPDATES.inc(kind=kind)
+    reply_calls = 1 if query or notify else 0
+    THROTTLE_API_CALLS_AVOIDED.inc(
+        max(0, _estimated_api_calls(update, len(screens.channels)) - reply_calls)
     )
+    if notify:
+        logger.info("Throttling user %s", update.effective_user.id)
+    
+    try:
+        if query:
+            await query.answer(screens.throttled.text if notify else None)
+        elif notify:
+            await send_screen(update, screens.throttled)
+    except TelegramError as e:
+        logger.debug("Could not send throttle notice to user %s: %s", update.effective_user.id, str(e))
+    raise ApplicationHandlerStop
+
+@timed_handler
+async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /start command."""
+    user = update.effective_user
+    logger.info("User %s (%s) started the bot", user.id, user.username)
+    
+    await send_screen(update, get_render_cache().welcome)
 
+@timed_handler
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /help command."""
-    await update.message.reply_text(
-        MESSAGES["help"],
-        parse_mode=ParseMode.HTML
-    )
+    await send_screen(update, get_render_cache().help)
 
+@timed_handler
+@traced("verify_command")
 async def verify_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /verify command."""
     await verify_membership(update, context)
 
+@timed_handler
+@traced("verify_callback")
 async def verify_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the verify button callback."""
     query = update.callback_query
-    await query.answer()
+    if query.message:
+        message_key = (query.message.chat_id, query.message.message_id)
+    else:
+        message_key = query.inline_message_id
+    
+    current_span().set(user_id=update.effective_user.id)
+    
+    # Repeated taps while this message is being verified only get acknowledged
+    if verify_message_flights.in_flight(message_key):
+        current_span().set(coalesced=True)
+        await _answer(update)
+        return
+    
+    await verify_message_flights.run(message_key, lambda: _verify_callback(update, context))
+
+async def _verify_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Run the verify callback flow for a message that isn't already being verified."""
+    level = _overload_level()
+    if level >= LEVEL_BUSY:
+        # Answering the tap is the cheapest reply there is; the message keeps its verify button
+        await _answer(update, get_render_cache().busy.text)
+        return
+    
+    skip_placeholder = level >= LEVEL_NO_PLACEHOLDER
+    if OPTIMISTIC_RENDERING or skip_placeholder:
+        # Acknowledge the tap while checking; the placeholder is only sent if the check is slow
+        answer = asyncio.ensure_future(_answer(update))
+        try:
+            await verify_membership(
+                update, context, is_callback=True,
+                placeholder_delay=None if skip_placeholder else VERIFY_PLACEHOLDER_DELAY, level=level
+            )
+        finally:
+            await answer
+        return
+    
+    await _answer(update)
     
     # Edit the message to show verification in progress
-    await query.edit_message_text(
-        text=MESSAGES["verification_start"],
-        parse_mode=ParseMode.HTML
-    )
+    await send_screen(update, get_render_cache().checking, is_callback=True)
     
     # Perform verification
-    await verify_membership(update, context, is_callback=True)
+    await verify_membership(update, context, is_callback=True, level=level)
 
+@timed_handler
 async def force_verify_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the force verify button callback for users who claim to have joined all channels."""
     query = update.callback_query
     await query.answer("🎉 SUCCESS! Here's your exclusive channel link!")
     
     user = update.effective_user
-    logger.info(f"User {user.id} ({user.username}) manually verified - granting access to exclusive channel")
-    
-    # Show verification complete message directly
-    message = MESSAGES["verification_complete"].format(
-        f"[{EXCLUSIVE_CHANNEL['name']}]({EXCLUSIVE_CHANNEL['url']})"
+    logger.info(
+        "User %s (%s) manually verified - granting access to exclusive channel",
+        user.id, user.username
     )
     
-    # Create keyboard with join button for exclusive channel
-    keyboard = [[InlineKeyboardButton("🚀 Join Now Whatsapp/Telegram OTP Grup", url=EXCLUSIVE_CHANNEL['url'])]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    verified_store.record(user.id, True, METHOD_MANUAL)
     
-    await query.edit_message_text(
-        text=message,
-        parse_mode=ParseMode.HTML,
-        reply_markup=reply_markup,
-        disable_web_page_preview=True
-    )
+    # Show verification complete message directly
+    await send_screen(update, get_render_cache().manual_complete, is_callback=True)
 
-async def verify_membership(update: Update, context: ContextTypes.DEFAULT_TYPE, is_callback: bool = False) -> None:
-    """Verify user membership across all required channels."""
+@traced("verify_membership")
+async def verify_membership(update: Update, context: ContextTypes.DEFAULT_TYPE, is_callback: bool = False,
+                            placeholder_delay: Optional[float] = None, level: Optional[int] = None) -> None:
+    """
+    Verify user membership across all required channels.
+    
+    If placeholder_delay is set, the "checking" screen is shown only when the
+    check takes longer than that many seconds, and always before the result.
+    level is the overload degradation level to apply; it is looked up if the
+    caller hasn't already done so.
+    """
     user = update.effective_user
-    logger.info(f"Verifying membership for user {user.id} ({user.username})")
+    logger.info("Verifying membership for user %s (%s)", user.id, user.username)
+    
+    # Use one configuration snapshot for the whole check, even if it is reloaded meanwhile
+    screens = get_render_cache()
+    if level is None:
+        level = _overload_level()
+    span = current_span()
+    span.set(user_id=user.id, level=level)
     
     try:
-        # Check membership status
-        joined_channels, not_joined_channels = await check_user_membership(
-            context.bot, user.id
-        )
+        if level >= LEVEL_BUSY:
+            span.set(outcome="busy")
+            await send_screen(update, screens.busy, is_callback)
+            return
+        
+        # Users who passed automatic verification recently get access right away
+        if await verified_store.is_recently_verified(user.id):
+            logger.info("User %s verified recently - granting access from store", user.id)
+            span.set(outcome="complete", source="store")
+            await handle_verification_complete(update, context, is_callback)
+            return
+        
+        # Check membership status, sharing any check already running for this user
+        check = asyncio.ensure_future(membership_flights.run(
+            user.id,
+            lambda: check_user_membership(
+                context.bot, user.id, cache=membership_cache,
+                index=get_membership_index(),
+                channels=screens.channels, breakers=channel_breakers,
+                budget=MEMBERSHIP_RESPONSE_BUDGET, cached_only=level >= LEVEL_CACHED_ONLY
+            )
+        ))
+        try:
+            if placeholder_delay is not None:
+                await _placeholder_if_slow(update, check, screens.checking, placeholder_delay)
+            result, executed = await check
+            span.set(shared_check=not executed)
+        except asyncio.CancelledError:
+            check.cancel()
+            raise
+        
+        # Only definitive outcomes are worth remembering
+        if not result.unknown and not result.pending:
+            verified_store.record(user.id, not result.not_joined, METHOD_AUTO)
         
         # Determine response based on verification results
-        if not not_joined_channels:  # All channels joined
+        if not result.not_joined:  # All channels joined
+            span.set(outcome="complete")
             await handle_verification_complete(update, context, is_callback)
-        elif not joined_channels:  # No channels joined
-            await handle_no_membership(update, context, not_joined_channels[0], is_callback)
-        else:  # Partial membership
-            await handle_partial_membership(update, context, joined_channels, not_joined_channels, is_callback)
+        elif level >= LEVEL_MANUAL:
+            # Shedding load: cached results didn't grant access, so offer the manual path
+            span.set(outcome="manual")
+            await handle_verification_error(update, context, is_callback)
+        elif result.pending:
+            # Reply within the budget; the slow lookups finish in the background
+            span.set(outcome="progress")
+            await send_screen(
+                update,
+                screens.progress(screens.mask_for(result.joined), screens.mask_for(result.pending)),
+                is_callback
+            )
+        elif len(result.unverifiable) == len(result.not_joined):
+            # Only channels we can't read are left, so offer the manual path
+            logger.info(
+                "User %s can't be verified automatically in %s channel(s)",
+                user.id, len(result.unverifiable)
+            )
+            span.set(outcome="manual")
+            await handle_verification_error(update, context, is_callback)
+        elif not result.missing:
+            # Nothing is known to be missing; Telegram was just too slow to tell
+            logger.info(
+                "Membership of user %s unknown in %s channel(s) after retries",
+                user.id, len(result.unknown)
+            )
+            span.set(outcome="unknown")
+            await send_screen(update, screens.unknown, is_callback)
+        else:  # No or partial membership
+            span.set(outcome="partial")
+            mask = screens.mask_for(result.joined)
+            await send_screen(update, screens.for_mask(mask), is_callback)
             
     except Exception as e:
-        logger.error(f"Error during verification for user {user.id}: {str(e)}")
+        logger.error("Error during verification for user %s: %s", user.id, str(e))
+        span.set(outcome="error", error=type(e).__name__)
         await handle_verification_error(update, context, is_callback)
 
-async def handle_verification_complete(update: Update, context: ContextTypes.DEFAULT_TYPE, is_callback: bool = False) -> None:
-    """Handle successful verification."""
-    message = MESSAGES["verification_complete"].format(
-        f"[{EXCLUSIVE_CHANNEL['name']}]({EXCLUSIVE_CHANNEL['url']})"
-    )
-    
-    keyboard = [[InlineKeyboardButton("🚀 Join Now Whatsapp/Telegram OTP Grup", url=EXCLUSIVE_CHANNEL['url'])]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    if is_callback:
-        await update.callback_query.edit_message_text(
-            text=message,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup,
-            disable_web_page_preview=True
-        )
-    else:
-        await update.message.reply_text(
-            text=message,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup,
-            disable_web_page_preview=True
-        )
-
-async def handle_no_membership(update: Update, context: ContextTypes.DEFAULT_TYPE, channel: dict, is_callback: bool = False) -> None:
-    """Handle case where user hasn't joined any channel."""
-    message = MESSAGES["not_member"].format(
-        channel['name'],
-        channel['url']
-    )
-    
-    keyboard = [
-        [InlineKeyboardButton(f"Join {channel['name']}", url=channel['url'])],
-        [InlineKeyboardButton("🔍 Check Again", callback_data="verify")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    if is_callback:
-        await update.callback_query.edit_message_text(
-            text=message,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup,
-            disable_web_page_preview=True
-        )
-    else:
-        await update.message.reply_text(
-            text=message,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup,
-            disable_web_page_preview=True
-        )
-
-async def handle_partial_membership(update: Update, context: ContextTypes.DEFAULT_TYPE, joined: List[dict], not_joined: List[dict], is_callback: bool = False) -> None:
-    """Handle case where user has joined some but not all channels."""
-    remaining_channels = format_remaining_channels(not_joined)
-    message = MESSAGES["partial_verification"].format(
-        len(joined),
-        len(REQUIRED_CHANNELS),
-        remaining_channels
-    )
-    
-    keyboard = [
-        [InlineKeyboardButton(f"Join {channel['name']}", url=channel['url'])] for channel in not_joined
-    ]
-    keyboard.append([InlineKeyboardButton("🔍 Check Again", callback_data="verify")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    if is_callback:
-        await update.callback_query.edit_message_text(
-            text=message,
-            parse_mode=ParseMode.HTML,
-            reply_markup=reply_markup,
-            disable_web_page_preview=True
-        )
-    else:
-        await update.message.reply_text(
-            text=message,
-            parse_mode=ParseMode.HTML,
-            reply_markup=reply_markup,
-            disable_web_page_preview=True
-        )
-
-async def handle_verification_error(update: Update, context: ContextTypes.DEFAULT_TYPE, is_callback: bool = False) -> None:
-    """Handle verification errors."""
-    message = MESSAGES["verification_error"]
-    
-    keyboard = [
-        [InlineKeyboardButton(f"Join {channel['name']}", url=channel['url'])] for channel in REQUIRED_CHANNELS
-    ]
-    keyboard.append([InlineKeyboardButton("✅ I've Joined All Channels - Get Access Now!", callback_data="force_verify")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    if is_callback:
-        await update.callback_query.edit_message_text(
-            text=message,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup,
-            disable_web_page_preview=True
-        )
-    else:
-        await update.message.reply_text(
-            text=message,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup,
-            disable_web_page_preview=True
-        )
+async def _placeholder_if_slow(update: Update, check: asyncio.Future, placeholder: RenderedScreen,
+                               delay: float) -> None:
+    """Show the placeholder screen if the check is still running after delay seconds."""
+    try:
+        await asyncio.wait_for(asyncio.shield(check), delay)
+    except asyncio.TimeoutError:
+        try:
+            await send_screen(update, placeholder, is_callback=True)
+            VERIFY_PLACEHOLDERS.inc(outcome="sent")
+            current_span().set(placeholder="sent")
+        except TelegramError as e:
+            # The result edit still follows, so a failed placeholder isn't fatal
+            logger.debug("Could not show placeholder for user %s: %s", update.effective_user.id, str(e))
+        return
+    except Exception:
+        # Check failures are handled where the check is awaited
+        pass
+    VERIFY_PLACEHOLDERS.inc(outcome="skipped")
+    current_span().set(placeholder="skipped")
 
 async def handle_verification_complete(update: Update, context: ContextTypes.DEFAULT_TYPE, is_callback: bool) -> None:
     """Handle successful verification of all channels."""
     user = update.effective_user
-    logger.info(f"User {user.id} successfully verified all channels")
-    
-    message = MESSAGES["verification_complete"].format(
-        f"[{EXCLUSIVE_CHANNEL['name']}]({EXCLUSIVE_CHANNEL['url']})"
-    )
+    logger.info("User %s successfully verified all channels", user.id)
     
-    # Create keyboard with join button for exclusive channel
-    keyboard = [[InlineKeyboardButton("🚀 Join Now Whatsapp/Telegram OTP Grup", url=EXCLUSIVE_CHANNEL['url'])]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    if is_callback:
-        await update.callback_query.edit_message_text(
-            text=message,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup,
-            disable_web_page_preview=True
-        )
-    else:
-        await update.message.reply_text(
-            message,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup,
-            disable_web_page_preview=True
-        )
-
-async def handle_no_membership(update: Update, context: ContextTypes.DEFAULT_TYPE, first_channel: dict, is_callback: bool) -> None:
-    """Handle case where user hasn't joined any channels."""
-    # Show all channels that need to be joined
-    channels_text = format_channel_list(REQUIRED_CHANNELS)
-    message = f"""🚫 ACCESS DENIED 🚫
-
-🔥 Join All Channels First:
-
-{channels_text}
-
-⚡ Then click 'Verify Again' for premium access!"""
-    
-    # Create keyboard with join buttons for all channels and verify button
-    keyboard = []
-    for channel in REQUIRED_CHANNELS:
-        keyboard.append([InlineKeyboardButton(f"📱 Join {channel['name']}", url=channel['url'])])
-    keyboard.append([InlineKeyboardButton("🔍 Verify Again", callback_data="verify")])
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    if is_callback:
-        await update.callback_query.edit_message_text(
-            text=message,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup,
-            disable_web_page_preview=True
-        )
-    else:
-        await update.message.reply_text(
-            message,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup,
-            disable_web_page_preview=True
-        )
-
-async def handle_partial_membership(update: Update, context: ContextTypes.DEFAULT_TYPE, joined: list, not_joined: list, is_callback: bool) -> None:
-    """Handle case where user has joined some but not all channels."""
-    remaining_channels = format_remaining_channels(not_joined)
-    message = MESSAGES["partial_verification"].format(
-        len(joined),
-        len(REQUIRED_CHANNELS),
-        remaining_channels
-    )
-    
-    # Create keyboard with join buttons for remaining channels and verify button
-    keyboard = []
-    for channel in not_joined:
-        keyboard.append([InlineKeyboardButton(f"📱 Join {channel['name']}", url=channel['url'])])
-    keyboard.append([InlineKeyboardButton("🔍 Verify Again", callback_data="verify")])
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    if is_callback:
-        await update.callback_query.edit_message_text(
-            text=message,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup,
-            disable_web_page_preview=True
-        )
-    else:
-        await update.message.reply_text(
-            message,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup,
-            disable_web_page_preview=True
-        )
+    await send_screen(update, get_render_cache().complete, is_callback)
 
 async def handle_verification_error(update: Update, context: ContextTypes.DEFAULT_TYPE, is_callback: bool) -> None:
     """Handle verification errors."""
-    # Create keyboard with join buttons for all channels and special access button
-    keyboard = []
-    for channel in REQUIRED_CHANNELS:
-        keyboard.append([InlineKeyboardButton(f"📱 Join {channel['name']}", url=channel['url'])])
-    
-    # Add special access button for users who have joined all channels
-    keyboard.append([InlineKeyboardButton("✅ I've Joined All Channels - Get Access Now!", callback_data="force_verify")])
-    keyboard.append([InlineKeyboardButton("🔄 Try Auto-Verify Again", callback_data="verify")])
+    await send_screen(update, get_render_cache().error, is_callback)
+
+@timed_handler
+async def track_chat_member(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Update the membership index and cache from a chat_member update."""
+    result = update.chat_member
+    if not result or not result.chat.username:
+        return
     
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    channel_username = result.chat.username
+    membership_index = get_membership_index()
+    if membership_index is None or membership_index.bit_for(channel_username) is None:
+        return
     
-    if is_callback:
-        await update.callback_query.edit_message_text(
-            text=MESSAGES["verification_error"],
-            parse_mode=ParseMode.HTML,
-            reply_markup=reply_markup
-        )
-    else:
-        await update.message.reply_text(
-            MESSAGES["verification_error"],
-            parse_mode=ParseMode.HTML,
-            reply_markup=reply_markup
-        )
+    new_member = result.new_chat_member
+    is_member = new_member.status in ['member', 'administrator', 'creator'] or (
+        new_member.status == 'restricted' and getattr(new_member, 'is_member', False)
+    )
+    membership_index.record(new_member.user.id, channel_username, is_member)
+    membership_cache.set(new_member.user.id, channel_username, is_member)
+    logger.debug(
+        "chat_member update: user %s in @%s -> %s",
+        new_member.user.id, channel_username, new_member.status
+    )
 
+@timed_handler
 async def unknown_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle unknown commands."""
     await update.message.reply_text(
@@ -338,7 +360,7 @@ async def unknown_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 # Error handler
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Log errors caused by Updates."""
-    logger.error(f"Exception while handling an update: {context.error}")
+    logger.error("Exception while handling an update: %s", context.error)
     
     # If it's an update with a message, try to inform the user
     if isinstance(update, Update) and update.effective_message:
@@ -347,4 +369,4 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
                 "⚠️ An error occurred. Please try again later."
             )
         except Exception as e:
-            logger.error(f"Failed to send error message to user: {e}")
+            logger.error("Failed to send error message to user: %s", e)
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+import httpx
+from telegram.error import TimedOut
+from telegram.request import HTTPXRequest
+from config import (
+    HTTP_KEEPALIVE_CONNECTIONS, HTTP_KEEPALIVE_EXPIRY, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT,
+    HTTP_WRITE_TIMEOUT, HTTP_POOL_TIMEOUT, HTTP_VERSION
+)
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+POOL_WAIT = registry.histogram(
+    "bot_http_pool_wait_seconds", "Time Bot API requests waited for a free connection", ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+POOL_TIMEOUTS = registry.counter(
+    "bot_http_pool_timeouts_total", "Requests that gave up waiting for a free connection", ["pool"]
+)
+
+class InstrumentedRequest(HTTPXRequest):
+    """
+    HTTPXRequest that measures how long requests wait for a pooled connection.
+    
+    Requests take a slot from a semaphore sized like the connection pool before
+    reaching httpx, so the wait happens (and is timed) here instead of inside
+    the pool, and httpx always finds a free connection.
+    """
+    
+    def __init__(self, name: str, connection_pool_size: int, **kwargs):
+        """
+        Initialize the request object.
+        
+        Args:
+            name: Pool name used as the metric label ("api" or "updates")
+            connection_pool_size: Maximum concurrent connections
+            **kwargs: Passed to HTTPXRequest
+        """
+        super().__init__(connection_pool_size=connection_pool_size, **kwargs)
+        self.name = name
+        self.pool_size = connection_pool_size
+        self._slots = asyncio.Semaphore(connection_pool_size)
+        self._default_pool_timeout = kwargs.get("pool_timeout")
+        self.in_use = 0
+        self.waiting = 0
+    
+    async def do_request(self, url: str, method: str, request_data=None,
+                         read_timeout=HTTPXRequest.DEFAULT_NONE, write_timeout=HTTPXRequest.DEFAULT_NONE,
+                         connect_timeout=HTTPXRequest.DEFAULT_NONE, pool_timeout=HTTPXRequest.DEFAULT_NONE):
+        """Wait for a connection slot, then send the request."""
+        timeout: Optional[float] = (
+            self._default_pool_timeout if pool_timeout is HTTPXRequest.DEFAULT_NONE else pool_timeout
+        )
+        
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            POOL_TIMEOUTS.inc(pool=self.name)
+            raise TimedOut(
+                f"Pool timeout: all {self.pool_size} connections of the '{self.name}' pool are "
+                f"occupied. Consider raising HTTP_POOL_SIZE."
+            ) from None
+        finally:
+            self.waiting -= 1
+            POOL_WAIT.observe(time.perf_counter() - started, pool=self.name)
+        
+        self.in_use += 1
+        try:
+            return await super().do_request(
+                url, method, request_data, read_timeout=read_timeout, write_timeout=write_timeout,
+                connect_timeout=connect_timeout, pool_timeout=pool_timeout
+            )
+        finally:
+            self.in_use -= 1
+            self._slots.release()
+
+def build_request(name: str, pool_size: int) -> InstrumentedRequest:
+    """
+    Create a request object from the HTTP_* settings.
+    
+    Args:
+        name: Pool name used as the metric label
+        pool_size: Maximum concurrent connections in the pool
+    
+    Returns:
+        InstrumentedRequest: The configured request object
+    """
+    http_version = HTTP_VERSION
+    if http_version != "1.1":
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning(
+                'HTTP/2 needs: pip install "python-telegram-bot[http2]"; using HTTP/1.1 for the %s pool', name
+            )
+            http_version = "1.1"
+    
+    pool_size = max(1, pool_size)
+    return InstrumentedRequest(
+        name,
+        connection_pool_size=pool_size,
+        connect_timeout=HTTP_CONNECT_TIMEOUT,
+        read_timeout=HTTP_READ_TIMEOUT,
+        write_timeout=HTTP_WRITE_TIMEOUT,
+        pool_timeout=HTTP_POOL_TIMEOUT,
+        http_version=http_version,
+        httpx_kwargs={
+            "limits": httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=min(pool_size, HTTP_KEEPALIVE_CONNECTIONS),
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            )
+        },
+    )
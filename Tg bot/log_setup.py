@@ -0,0 +1,169 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from config import (
+    LOG_LEVEL, LOG_FORMAT, LOG_FILE, LOG_RATE_LIMIT_PER_EVENT, LOG_SAMPLE_RATE
+)
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+    
+    def __init__(self, static_fields: Optional[Dict[str, str]] = None):
+        super().__init__()
+        self.static_fields = static_fields or {}
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.msg if isinstance(record.msg, str) else repr(record.msg),
+            "message": record.getMessage(),
+        }
+        entry.update(self.static_fields)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    """The classic text format, noting how many similar records were dropped."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text += f" (+{suppressed} similar suppressed)"
+        return text
+
+class SamplingFilter(logging.Filter):
+    """
+    Per-event rate limiting and sampling.
+    
+    An event type is the (logger name, message template) pair, so every
+    "User %s is member of @%s" line shares one budget regardless of its
+    arguments. ERROR and above always pass.
+    """
+    
+    def __init__(self, rate_per_event: float, sample_rate: float):
+        """
+        Create the filter.
+        
+        Args:
+            rate_per_event: Records per second allowed for each event type (0 = unlimited)
+            sample_rate: Fraction of DEBUG/INFO records kept (1.0 = all)
+        """
+        super().__init__()
+        self.rate_per_event = rate_per_event
+        self.sample_rate = sample_rate
+        self._budgets: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+        self.dropped = 0
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        
+        if record.levelno < logging.WARNING and self.sample_rate < 1.0:
+            if random.random() >= self.sample_rate:
+                self.dropped += 1
+                return False
+        
+        if self.rate_per_event <= 0:
+            return True
+        
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            # [tokens, last refill, suppressed since last emitted record]
+            budget = self._budgets.get(key)
+            if budget is None:
+                if len(self._budgets) > 10000:
+                    self._budgets.clear()
+                budget = self._budgets[key] = [self.rate_per_event, now, 0]
+            
+            budget[0] = min(self.rate_per_event, budget[0] + (now - budget[1]) * self.rate_per_event)
+            budget[1] = now
+            if budget[0] < 1:
+                budget[2] += 1
+                self.dropped += 1
+                return False
+            
+            budget[0] -= 1
+            if budget[2]:
+                record.suppressed = budget[2]
+                budget[2] = 0
+        return True
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves message formatting to the listener thread."""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT,
+                      log_file: str = LOG_FILE, static_fields: Optional[Dict[str, str]] = None) -> None:
+    """
+    Set up process-wide logging once.
+    
+    Records pass the sampling filter in the calling thread and are then handed
+    to a background thread through a queue, so the event loop never waits on
+    log I/O or formatting.
+    
+    Args:
+        level: Log level name (DEBUG, INFO, WARNING, ERROR)
+        log_format: "text" or "json"
+        log_file: Optional file to write to instead of stderr
+        static_fields: Extra fields added to every record (e.g. a worker ID)
+    """
+    global _listener
+    if _listener is not None:
+        return
+    
+    if log_format == "json":
+        formatter = JsonFormatter(static_fields)
+    else:
+        prefix = "".join(f"[{key} {value}] " for key, value in (static_fields or {}).items())
+        formatter = TextFormatter(TEXT_FORMAT.replace('%(name)s', prefix + '%(name)s'))
+    
+    if log_file:
+        output = logging.handlers.WatchedFileHandler(log_file, encoding="utf-8")
+    else:
+        output = logging.StreamHandler()
+    output.setFormatter(formatter)
+    
+    records = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(records)
+    queue_handler.addFilter(SamplingFilter(LOG_RATE_LIMIT_PER_EVENT, LOG_SAMPLE_RATE))
+    
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+    
+    # httpx logs every request at INFO, which floods the queue under load
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the background writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
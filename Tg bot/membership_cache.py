@@ -0,0 +1,99 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from config import (
+    MEMBERSHIP_CACHE_SIZE, MEMBERSHIP_CACHE_POSITIVE_TTL, MEMBERSHIP_CACHE_NEGATIVE_TTL
+)
+
+class MembershipCache:
+    """Bounded in-process TTL + LRU cache of per-channel membership results."""
+    
+    def __init__(self, max_size: int, positive_ttl: float, negative_ttl: float):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_size: Maximum number of (user_id, channel) entries kept
+            positive_ttl: Seconds a "member" result stays valid
+            negative_ttl: Seconds a "not member" result stays valid
+        """
+        self.max_size = max_size
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[bool, float]]" = OrderedDict()
+    
+    def get(self, user_id: int, channel_username: str) -> Optional[bool]:
+        """
+        Look up a cached membership result.
+        
+        Args:
+            user_id: The user ID
+            channel_username: Username of the channel
+        
+        Returns:
+            Optional[bool]: The cached result, or None on a miss or expired entry
+        """
+        key = (user_id, channel_username)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        is_member, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return is_member
+    
+    def set(self, user_id: int, channel_username: str, is_member: bool) -> None:
+        """
+        Store a membership result, evicting the least recently used entries if full.
+        
+        Args:
+            user_id: The user ID
+            channel_username: Username of the channel
+            is_member: Whether the user is a member of the channel
+        """
+        if self.max_size <= 0:
+            return
+        
+        ttl = self.positive_ttl if is_member else self.negative_ttl
+        if ttl <= 0:
+            return
+        
+        key = (user_id, channel_username)
+        self._entries[key] = (is_member, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """
+        Drop cached entries.
+        
+        Args:
+            user_id: Only drop entries for this user; drop everything if None
+        """
+        if user_id is None:
+            self._entries.clear()
+            return
+        
+        for key in [key for key in self._entries if key[0] == user_id]:
+            del self._entries[key]
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Shared cache used by verification handlers
+membership_cache = MembershipCache(
+    MEMBERSHIP_CACHE_SIZE, MEMBERSHIP_CACHE_POSITIVE_TTL, MEMBERSHIP_CACHE_NEGATIVE_TTL
+)
@@ -0,0 +1,217 @@
+import logging
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+from channel_config import current_config
+from config import MEMBERSHIP_INDEX_ENABLED
+
+logger = logging.getLogger(__name__)
+
+# Each slot packs two 32-bit masks: known channels (high half) and joined channels (low half)
+MAX_INDEXED_CHANNELS = 32
+_LOW_MASK = (1 << 32) - 1
+_EMPTY_KEY = 0
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+class MembershipIndex:
+    """
+    Compact in-memory index of user_id -> joined-channel bitmask.
+    
+    The index is fed by chat_member updates for channels where the bot is an
+    admin ("observable" channels) and by polled results for those channels.
+    Storage is an open-addressing hash table backed by two flat arrays, so each
+    user costs roughly 16 bytes per slot instead of a dict entry plus int objects.
+    """
+    
+    def __init__(self, channel_usernames: Iterable[str], initial_capacity: int = 1024):
+        """
+        Initialize the index.
+        
+        Args:
+            channel_usernames: Usernames of the required channels, in bit order
+            initial_capacity: Initial number of slots (rounded up to a power of two)
+        """
+        usernames = [username.lower() for username in channel_usernames]
+        if len(usernames) > MAX_INDEXED_CHANNELS:
+            raise ValueError(
+                f"Membership index supports at most {MAX_INDEXED_CHANNELS} channels"
+            )
+        
+        self._bits: Dict[str, int] = {username: 1 << i for i, username in enumerate(usernames)}
+        self._observable = 0
+        
+        capacity = 8
+        while capacity < initial_capacity:
+            capacity <<= 1
+        self._allocate(capacity)
+    
+    def _allocate(self, capacity: int) -> None:
+        """Allocate empty key and mask arrays with the given capacity."""
+        self._capacity = capacity
+        self._count = 0
+        self._keys = array('q', bytes(8 * capacity))
+        self._masks = array('Q', bytes(8 * capacity))
+    
+    def _slot(self, user_id: int) -> int:
+        """Find the slot holding user_id, or the empty slot where it belongs."""
+        mask = self._capacity - 1
+        slot = ((user_id * _HASH_MULTIPLIER) >> 16) & mask
+        keys = self._keys
+        while True:
+            key = keys[slot]
+            if key == user_id or key == _EMPTY_KEY:
+                return slot
+            slot = (slot + 1) & mask
+    
+    def _grow(self) -> None:
+        """Double the table size and re-insert all entries."""
+        old_keys, old_masks = self._keys, self._masks
+        self._allocate(self._capacity * 2)
+        for key, value in zip(old_keys, old_masks):
+            if key != _EMPTY_KEY:
+                slot = self._slot(key)
+                self._keys[slot] = key
+                self._masks[slot] = value
+                self._count += 1
+    
+    @property
+    def usernames(self) -> Tuple[str, ...]:
+        """Lower-case usernames of the indexed channels, in bit order."""
+        return tuple(self._bits)
+    
+    def bit_for(self, channel_username: str) -> Optional[int]:
+        """
+        Get the bit assigned to a channel.
+        
+        Args:
+            channel_username: Username of the channel
+        
+        Returns:
+            Optional[int]: The channel bit, or None if the channel isn't required
+        """
+        return self._bits.get(channel_username.lower())
+    
+    def set_observable(self, channel_username: str, observable: bool) -> None:
+        """
+        Mark whether chat_member updates are received for a channel.
+        
+        Args:
+            channel_username: Username of the channel
+            observable: True if the bot is an admin and receives chat_member updates
+        """
+        bit = self.bit_for(channel_username)
+        if bit is None:
+            return
+        if observable:
+            self._observable |= bit
+        else:
+            self._observable &= ~bit
+    
+    def is_observable(self, channel_username: str) -> bool:
+        """Check whether a channel is kept up to date by chat_member updates."""
+        bit = self.bit_for(channel_username)
+        return bit is not None and bool(self._observable & bit)
+    
+    def record(self, user_id: int, channel_username: str, is_member: bool) -> None:
+        """
+        Record a membership fact for an observable channel.
+        
+        Args:
+            user_id: The user ID
+            channel_username: Username of the channel
+            is_member: Whether the user is a member of the channel
+        """
+        bit = self.bit_for(channel_username)
+        if bit is None or not self._observable & bit or user_id == _EMPTY_KEY:
+            return
+        
+        slot = self._slot(user_id)
+        if self._keys[slot] == _EMPTY_KEY:
+            if (self._count + 1) * 3 > self._capacity * 2:
+                self._grow()
+                slot = self._slot(user_id)
+            self._keys[slot] = user_id
+            self._count += 1
+        
+        value = self._masks[slot] | (bit << 32)
+        value = value | bit if is_member else value & ~bit
+        self._masks[slot] = value
+    
+    def lookup(self, user_id: int, channel_username: str) -> Optional[bool]:
+        """
+        Answer a membership question from the index.
+        
+        Args:
+            user_id: The user ID
+            channel_username: Username of the channel
+        
+        Returns:
+            Optional[bool]: Membership if known for an observable channel, None otherwise
+        """
+        bit = self.bit_for(channel_username)
+        if bit is None or not self._observable & bit:
+            return None
+        
+        slot = self._slot(user_id)
+        if self._keys[slot] != user_id:
+            return None
+        
+        value = self._masks[slot]
+        if not (value >> 32) & bit:
+            return None
+        return bool(value & _LOW_MASK & bit)
+    
+    def observable_channels(self) -> List[str]:
+        """Get the usernames of all observable channels."""
+        return [username for username, bit in self._bits.items() if self._observable & bit]
+    
+    def memory_bytes(self) -> int:
+        """Approximate memory used by the table arrays."""
+        return self._keys.itemsize * len(self._keys) + self._masks.itemsize * len(self._masks)
+    
+    def __len__(self) -> int:
+        return self._count
+
+# Shared index fed by chat_member updates; built on first use
+_membership_index: Optional[MembershipIndex] = None
+_membership_index_built = False
+
+def build_membership_index(channel_usernames: Iterable[str]) -> Optional[MembershipIndex]:
+    """
+    Build an index for a channel list.
+    
+    Args:
+        channel_usernames: Usernames of the required channels, in bit order
+    
+    Returns:
+        Optional[MembershipIndex]: The index, or None if there are more
+            channels than fit in its bitmasks (all channels are then polled)
+    """
+    usernames = list(channel_usernames)
+    if len(usernames) > MAX_INDEXED_CHANNELS:
+        logger.warning(
+            "Membership index disabled: %s channels configured but at most %s are supported; "
+            "polling all channels", len(usernames), MAX_INDEXED_CHANNELS
+        )
+        return None
+    return MembershipIndex(usernames)
+
+def get_membership_index() -> Optional[MembershipIndex]:
+    """Get the index for the active channel configuration, or None if indexing is off."""
+    global _membership_index, _membership_index_built
+    if not MEMBERSHIP_INDEX_ENABLED:
+        return None
+    if not _membership_index_built:
+        _membership_index = build_membership_index(current_config().usernames)
+        _membership_index_built = True
+    return _membership_index
+
+def install_membership_index(index: Optional[MembershipIndex]) -> None:
+    """
+    Replace the shared index, e.g. after the channel list changed.
+    
+    Args:
+        index: Index built for the new channel list, or None to turn indexing off
+    """
+    global _membership_index, _membership_index_built
+    _membership_index = index
+    _membership_index_built = True
@@ -0,0 +1,283 @@
+import abc
+import asyncio
+import functools
+import logging
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric(abc.ABC):
+    """Base class for labelled metrics."""
+    
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+    
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+    
+    @abc.abstractmethod
+    def samples(self) -> Iterable[str]:
+        """Sample lines in Prometheus text format."""
+    
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class _ValueMetric(_Metric):
+    """Metric holding one value per label set, optionally computed at scrape time."""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Union[float, Dict[LabelValues, float]]]] = None):
+        """
+        Create the metric.
+        
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Label names
+            callback: Optional function returning the value (or a mapping of
+                label value tuples to values) whenever metrics are scraped
+        """
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback = callback
+    
+    def samples(self) -> Iterable[str]:
+        values = dict(self._values)
+        if self._callback is not None:
+            try:
+                result = self._callback()
+            except Exception as e:
+                logger.warning("Metric callback for %s failed: %s", self.name, str(e))
+                result = {}
+            values.update(result if isinstance(result, dict) else {(): result})
+        for key, value in values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Counter(_ValueMetric):
+    """
+    Monotonically increasing counter.
+    
+    A callback may report totals kept elsewhere (such as the rate limiter's
+    own counters); it must only ever return growing values.
+    """
+    
+    kind = "counter"
+    
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Increase the counter for the given label values."""
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels: str) -> float:
+        """Current value for the given label values."""
+        return self._values.get(self._key(labels), 0)
+
+class Gauge(_ValueMetric):
+    """Value that can go up and down, optionally computed at scrape time."""
+    
+    kind = "gauge"
+    
+    def set(self, value: float, **labels: str) -> None:
+        """Set the gauge for the given label values."""
+        self._values[self._key(labels)] = value
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed buckets."""
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+    
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation for the given label values."""
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * len(self.buckets)
+            self._sums[key] = 0.0
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        self._sums[key] += value
+    
+    def count(self, **labels: str) -> int:
+        """Number of observations for the given label values."""
+        return sum(self._counts.get(self._key(labels), ()))
+    
+    def samples(self) -> Iterable[str]:
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(self._sums[key])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+class Registry:
+    """Collection of metrics rendered together in Prometheus text format."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+    
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric, replacing any earlier metric with the same name."""
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                callback: Optional[Callable] = None) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, callback))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              callback: Optional[Callable] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+    
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+registry = Registry()
+
+# Core metrics
+HANDLER_LATENCY = registry.histogram(
+    "bot_handler_duration_seconds", "Time spent in each update handler", ["handler"]
+)
+HANDLER_ERRORS = registry.counter(
+    "bot_handler_errors_total", "Exceptions raised by update handlers", ["handler"]
+)
+GET_CHAT_MEMBER_LATENCY = registry.histogram(
+    "bot_get_chat_member_duration_seconds", "get_chat_member latency per channel and outcome",
+    ["channel", "outcome"]
+)
+MEMBERSHIP_LOOKUPS = registry.counter(
+    "bot_membership_lookups_total", "Membership lookups per channel by answering source",
+    ["channel", "source"]
+)
+MEMBERSHIP_ERRORS = registry.counter(
+    "bot_membership_errors_total", "get_chat_member failures by error class",
+    ["error_class"]
+)
+MEMBERSHIP_RETRIES = registry.counter(
+    "bot_membership_retries_total", "get_chat_member retries after transient failures",
+    ["channel", "reason"]
+)
+VERIFY_PLACEHOLDERS = registry.counter(
+    "bot_verify_placeholders_total", "Verify callbacks that sent or skipped the checking placeholder",
+    ["outcome"]
+)
+THROTTLED_UPDATES = registry.counter(
+    "bot_throttled_updates_total", "Commands and button presses rejected by the per-user throttle",
+    ["kind"]
+)
+THROTTLE_API_CALLS_AVOIDED = registry.counter(
+    "bot_throttle_api_calls_avoided_total",
+    "Estimated Bot API calls not made because updates were throttled"
+)
+OVERLOAD_SHED = registry.counter(
+    "bot_overload_shed_total", "Verifications degraded by the overload controller, by level",
+    ["level"]
+)
+UPDATE_LAG = registry.histogram(
+    "bot_update_lag_seconds", "Delay between a message being sent and its handling starting",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+
+def timed_handler(func: Callable) -> Callable:
+    """Decorator recording latency and errors of an async handler under its function name."""
+    name = func.__name__
+    
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name)
+            raise
+        finally:
+            HANDLER_LATENCY.observe(time.perf_counter() - started, handler=name)
+    
+    return wrapper
+
+class MetricsServer:
+    """Minimal HTTP server exposing the registry at /metrics."""
+    
+    def __init__(self, listen: str, port: int, metrics_registry: Registry = registry):
+        self.listen = listen
+        self.port = port
+        self.registry = metrics_registry
+        self._server: Optional[asyncio.AbstractServer] = None
+    
+    async def start(self) -> None:
+        """Start serving; does nothing if the port is 0."""
+        if not self.port or self._server is not None:
+            return
+        self._server = await asyncio.start_server(self._handle, self.listen, self.port)
+        logger.info("Metrics available at http://%s:%s/metrics", self.listen, self.port)
+    
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            
+            parts = request_line.decode("latin-1").split(" ")
+            path = parts[1].split("?")[0] if len(parts) > 1 else ""
+            if path == "/metrics":
+                status, body = "200 OK", self.registry.render().encode()
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
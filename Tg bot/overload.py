@@ -0,0 +1,126 @@
+import logging
+import math
+import time
+from typing import Callable, Sequence
+from config import (
+    OVERLOAD_LAG_THRESHOLDS, OVERLOAD_INFLIGHT_THRESHOLDS, OVERLOAD_LAG_HALF_LIFE, OVERLOAD_HOLD
+)
+
+logger = logging.getLogger(__name__)
+
+# Degradation levels; each one also applies everything below it
+LEVEL_NORMAL = 0
+LEVEL_CACHED_ONLY = 1     # answer from the membership index/cache, no getChatMember calls
+LEVEL_NO_PLACEHOLDER = 2  # also skip the intermediate "checking" edit
+LEVEL_MANUAL = 3          # offer the manual path unless cached results already grant access
+LEVEL_BUSY = 4            # reply "busy, retry shortly" without checking anything
+
+LEVEL_NAMES = ("normal", "cached_only", "no_placeholder", "manual", "busy")
+
+def _level_for(value: float, thresholds: Sequence[float]) -> int:
+    """Number of thresholds a value has reached."""
+    return sum(1 for threshold in thresholds if value >= threshold)
+
+class OverloadController:
+    """
+    Pick a degradation level for verifications from update lag and load.
+    
+    Update lag is smoothed with an exponentially decaying average, so a
+    single late message doesn't trigger shedding and the lag estimate falls
+    back to zero once messages arrive on time again (or stop arriving). The
+    level rises as soon as either signal crosses a threshold, but only drops
+    one step per hold period so it doesn't flap at the boundary.
+    """
+    
+    def __init__(self, lag_thresholds: Sequence[float], inflight_thresholds: Sequence[float],
+                 lag_half_life: float, hold: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the controller.
+        
+        Args:
+            lag_thresholds: Update lag in seconds at which each level starts
+            inflight_thresholds: In-flight verifications at which each level starts
+            lag_half_life: Seconds for the lag estimate to halve without new samples
+            hold: Minimum seconds between steps down
+            clock: Monotonic time source
+        """
+        self.lag_thresholds = tuple(lag_thresholds)[:LEVEL_BUSY]
+        self.inflight_thresholds = tuple(inflight_thresholds)[:LEVEL_BUSY]
+        self.lag_half_life = max(0.001, lag_half_life)
+        self.hold = hold
+        self.clock = clock
+        self.changes = 0
+        self._lag = 0.0
+        self._lag_at = clock()
+        self._level = LEVEL_NORMAL
+        self._level_at = clock()
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether any threshold is configured."""
+        return bool(self.lag_thresholds or self.inflight_thresholds)
+    
+    def _decayed_lag(self, now: float) -> float:
+        return self._lag * math.pow(0.5, (now - self._lag_at) / self.lag_half_life)
+    
+    @property
+    def lag(self) -> float:
+        """Current smoothed update lag in seconds."""
+        return self._decayed_lag(self.clock())
+    
+    def observe_lag(self, seconds: float) -> None:
+        """
+        Record how late an update was handled.
+        
+        Args:
+            seconds: Time between the update being sent and its handling starting
+        """
+        now = self.clock()
+        lag = self._decayed_lag(now)
+        # Rise quickly on late updates, settle more slowly on timely ones
+        weight = 0.5 if seconds > lag else 0.1
+        self._lag = lag + weight * (seconds - lag)
+        self._lag_at = now
+    
+    def level(self, in_flight: int) -> int:
+        """
+        Get the degradation level to apply to a verification.
+        
+        Args:
+            in_flight: Membership checks currently running
+        
+        Returns:
+            int: One of the LEVEL_* constants
+        """
+        if not self.enabled:
+            return LEVEL_NORMAL
+        now = self.clock()
+        target = max(
+            _level_for(self._decayed_lag(now), self.lag_thresholds),
+            _level_for(in_flight, self.inflight_thresholds)
+        )
+        if target > self._level:
+            self._set_level(target, now)
+        elif target < self._level and now - self._level_at >= self.hold:
+            self._set_level(self._level - 1, now)
+        return self._level
+    
+    def _set_level(self, level: int, now: float) -> None:
+        logger.warning(
+            "Overload level %s -> %s (%s), update lag %.1fs",
+            LEVEL_NAMES[self._level], LEVEL_NAMES[level],
+            "shedding" if level > self._level else "recovering", self._decayed_lag(now)
+        )
+        self._level = level
+        self._level_at = now
+        self.changes += 1
+    
+    @property
+    def current_level(self) -> int:
+        """The level most recently applied, without re-evaluating it."""
+        return self._level
+
+# Shared controller for verification requests
+overload_controller = OverloadController(
+    OVERLOAD_LAG_THRESHOLDS, OVERLOAD_INFLIGHT_THRESHOLDS, OVERLOAD_LAG_HALF_LIFE, OVERLOAD_HOLD
+)
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from typing import Dict, List
+from telegram import Bot
+from telegram.error import TelegramError
+from circuit_breaker import channel_breakers
+from utils import ChannelInfo, channel_registry, is_bot_admin_in_channel
+
+logger = logging.getLogger(__name__)
+
+async def resolve_channel(bot: Bot, channel: dict) -> ChannelInfo:
+    """
+    Resolve a channel's numeric chat ID and check the bot's admin rights.
+    
+    Args:
+        bot: The Telegram bot instance
+        channel: Channel dictionary containing 'username'
+    
+    Returns:
+        ChannelInfo: The resolved information; error is set if resolution failed
+    """
+    username = channel['username']
+    try:
+        chat = await bot.get_chat(chat_id=f"@{username}")
+    except TelegramError as e:
+        logger.error("Could not resolve @%s: %s", username, str(e))
+        return ChannelInfo(username, error=str(e))
+    except Exception as e:
+        # Preflight must never keep the bot from starting
+        logger.exception("Unexpected error resolving @%s", username)
+        return ChannelInfo(username, error=str(e))
+    
+    is_admin = await is_bot_admin_in_channel(bot, username, chat_id=chat.id)
+    return ChannelInfo(username, chat.id, chat.title, is_admin)
+
+async def run_preflight(bot: Bot, channels: List[dict]) -> Dict[str, ChannelInfo]:
+    """
+    Resolve required channels concurrently and report problems.
+    
+    Results are merged into the channel registry, so it can also be run for a
+    reloaded channel list while handlers keep using the existing entries.
+    
+    Args:
+        bot: The Telegram bot instance
+        channels: Required channels to check
+    
+    Returns:
+        Dict[str, ChannelInfo]: The updated channel registry
+    """
+    results = await asyncio.gather(*(resolve_channel(bot, channel) for channel in channels))
+    
+    for info in results:
+        channel_registry[info.username.lower()] = info
+    
+    unverifiable = [info for info in results if not info.can_verify]
+    for info in unverifiable:
+        reason = info.error or "bot is not an administrator"
+        logger.warning(
+            "Membership in @%s cannot be verified automatically (%s); "
+            "users will be offered manual verification", info.username, reason
+        )
+        # Without admin rights every lookup would fail, so start with the breaker open
+        if info.chat_id is not None:
+            channel_breakers.get(info.username).trip()
+    logger.info(
+        "Preflight resolved %s/%s channels, %s verifiable",
+        sum(1 for info in results if info.chat_id is not None),
+        len(results), len(results) - len(unverifiable)
+    )
+    return channel_registry
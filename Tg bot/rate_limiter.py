@@ -0,0 +1,269 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Request priorities (lower value is served first)
+PRIORITY_USER = 0
+PRIORITY_BACKGROUND = 10
+
+# Endpoints that count against the per-chat message limits
+_PER_CHAT_PREFIXES = ("send", "edit", "copy", "forward")
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate."""
+    
+    def __init__(self, rate: float, capacity: float):
+        """
+        Initialize a full bucket.
+        
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def delay(self, now: float) -> float:
+        """
+        Get the seconds until a token is available.
+        
+        Args:
+            now: Current monotonic time
+        
+        Returns:
+            float: 0 if a token is available now, otherwise the wait in seconds
+        """
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+    
+    def consume(self) -> None:
+        """Take one token; call only after delay() returned 0."""
+        self.tokens -= 1
+    
+    def is_full(self, now: float) -> bool:
+        """Check whether the bucket has refilled completely."""
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+class PriorityRateLimiter(BaseRateLimiter[int]):
+    """
+    Shared Bot API scheduler enforcing global and per-chat limits.
+    
+    Every request made through the bot waits in a priority queue until both the
+    global bucket and (for message-sending endpoints) the chat's bucket have a
+    token. Excess calls are queued rather than rejected, and a RetryAfter from
+    Telegram pauses the whole scheduler before the call is retried.
+    
+    Pass ``rate_limit_args=PRIORITY_BACKGROUND`` to a bot method to mark it as
+    background work; everything else is treated as a user-facing request.
+    """
+    
+    def __init__(self, overall_rate: float = 30.0, per_chat_rate: float = 1.0,
+                 per_chat_burst: float = 3.0, group_rate: float = 20 / 60,
+                 max_retries: int = 3):
+        """
+        Initialize the scheduler.
+        
+        Args:
+            overall_rate: Requests per second across all chats
+            per_chat_rate: Messages per second in a private chat
+            per_chat_burst: Messages a single chat may send back to back
+            group_rate: Messages per second in a group or channel
+            max_retries: How often a request is retried after RetryAfter
+        """
+        self.overall_rate = overall_rate
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        
+        self._overall = TokenBucket(overall_rate, max(1.0, overall_rate))
+        self._chat_buckets: Dict[Union[int, str], TokenBucket] = {}
+        self._queue: List[list] = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+        
+        # Measurements
+        self.wait_count: Dict[int, int] = {}
+        self.wait_total: Dict[int, float] = {}
+        self.wait_max: Dict[int, float] = {}
+        self.retry_after_count = 0
+    
+    async def initialize(self) -> None:
+        """Start the dispatcher task."""
+        if self._dispatcher is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        logger.info(
+            "Rate limiter started (%.1f req/s overall, %.1f msg/s per chat)",
+            self.overall_rate, self.per_chat_rate
+        )
+    
+    async def shutdown(self) -> None:
+        """Stop the dispatcher and release any queued requests."""
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        
+        for entry in self._queue:
+            if not entry[3].done():
+                entry[3].cancel()
+        self._queue.clear()
+    
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for a token."""
+        return sum(1 for entry in self._queue if not entry[3].done())
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get scheduler measurements.
+        
+        Returns:
+            Dict[str, Any]: Queue depth, RetryAfter count and per-priority wait times
+        """
+        return {
+            "queue_depth": self.queue_depth,
+            "retry_after": self.retry_after_count,
+            "waits": {
+                priority: {
+                    "count": self.wait_count[priority],
+                    "total_seconds": self.wait_total[priority],
+                    "max_seconds": self.wait_max[priority],
+                }
+                for priority in self.wait_count
+            },
+        }
+    
+    def _chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            # Negative IDs and @usernames are groups/channels with a per-minute limit
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            rate = self.group_rate if is_group else self.per_chat_rate
+            bucket = TokenBucket(rate, self.per_chat_burst)
+            self._chat_buckets[chat_id] = bucket
+            
+            if len(self._chat_buckets) > 10000:
+                now = time.monotonic()
+                for key in [key for key, value in self._chat_buckets.items() if value.is_full(now)]:
+                    del self._chat_buckets[key]
+        return bucket
+    
+    async def _acquire(self, priority: int, chat_id: Optional[Union[int, str]]) -> None:
+        """Wait in the queue until the dispatcher grants this request a token."""
+        future = asyncio.get_running_loop().create_future()
+        enqueued = time.monotonic()
+        heapq.heappush(self._queue, [priority, next(self._sequence), chat_id, future])
+        self._wakeup.set()
+        await future
+        
+        waited = time.monotonic() - enqueued
+        self.wait_count[priority] = self.wait_count.get(priority, 0) + 1
+        self.wait_total[priority] = self.wait_total.get(priority, 0.0) + waited
+        self.wait_max[priority] = max(self.wait_max.get(priority, 0.0), waited)
+    
+    async def _dispatch(self) -> None:
+        """Hand out tokens to queued requests in priority order."""
+        while True:
+            while self._queue and self._queue[0][3].done():
+                heapq.heappop(self._queue)
+            
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            
+            now = time.monotonic()
+            delay = max(self._paused_until - now, self._overall.delay(now))
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            
+            # Take the best entry whose chat bucket has a token
+            held: List[list] = []
+            granted = False
+            chat_delay = float("inf")
+            while self._queue:
+                entry = heapq.heappop(self._queue)
+                if entry[3].done():
+                    continue
+                chat_id = entry[2]
+                wait = 0.0 if chat_id is None else self._chat_bucket(chat_id).delay(now)
+                if wait == 0:
+                    if chat_id is not None:
+                        self._chat_bucket(chat_id).consume()
+                    self._overall.consume()
+                    entry[3].set_result(None)
+                    granted = True
+                    break
+                chat_delay = min(chat_delay, wait)
+                held.append(entry)
+            
+            for entry in held:
+                heapq.heappush(self._queue, entry)
+            
+            if not granted and held:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=chat_delay)
+                except asyncio.TimeoutError:
+                    pass
+    
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        """Queue the request until allowed, then run it, retrying after RetryAfter."""
+        priority = rate_limit_args if isinstance(rate_limit_args, int) else PRIORITY_USER
+        chat_id = None
+        if endpoint.startswith(_PER_CHAT_PREFIXES):
+            chat_id = data.get("chat_id")
+        
+        attempt = 0
+        while True:
+            await self._acquire(priority, chat_id)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                attempt += 1
+                self.retry_after_count += 1
+                retry_after = e.retry_after
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+                
+                self._paused_until = max(self._paused_until, time.monotonic() + float(retry_after))
+                if attempt > self.max_retries:
+                    raise
+                logger.warning(
+                    "Flood limit hit on %s, pausing all requests for %ss (attempt %s/%s)",
+                    endpoint, retry_after, attempt, self.max_retries
+                )
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Tuple
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import ParseMode
+from channel_config import ChannelConfig, add_reload_listener, current_config
+from utils import format_channel_list, format_remaining_channels
+
+logger = logging.getLogger(__name__)
+
+# Channel counts up to this size get every joined-subset screen built eagerly
+EAGER_SUBSET_LIMIT = 10
+# Upper bound on subset screens kept when they are built lazily
+MAX_CACHED_SUBSETS = 4096
+
+class RenderedScreen:
+    """Immutable, pre-built message text and send options."""
+    
+    __slots__ = ("text", "kwargs")
+    
+    def __init__(self, text: str, parse_mode: str, reply_markup: InlineKeyboardMarkup = None,
+                 disable_web_page_preview: bool = None):
+        """
+        Build a screen.
+        
+        Args:
+            text: Message text
+            parse_mode: Telegram parse mode for the text
+            reply_markup: Inline keyboard shown under the message
+            disable_web_page_preview: Whether to suppress link previews
+        """
+        kwargs: Dict[str, Any] = {"parse_mode": parse_mode}
+        if reply_markup is not None:
+            kwargs["reply_markup"] = reply_markup
+        if disable_web_page_preview is not None:
+            kwargs["disable_web_page_preview"] = disable_web_page_preview
+        
+        object.__setattr__(self, "text", text)
+        object.__setattr__(self, "kwargs", MappingProxyType(kwargs))
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("RenderedScreen is immutable")
+
+class RenderCache:
+    """Every screen the bot can show, built once from the channel configuration."""
+    
+    def __init__(self, channels: List[dict], exclusive_channel: dict, messages: Mapping[str, str]):
+        """
+        Build all static screens and the joined-subset screens.
+        
+        Args:
+            channels: Required channels, in bitmask order
+            exclusive_channel: Channel revealed after verification
+            messages: Message templates
+        """
+        self.channels = list(channels)
+        self.full_mask = (1 << len(self.channels)) - 1
+        self._exclusive_channel = exclusive_channel
+        self._messages = messages
+        
+        self.welcome = RenderedScreen(
+            messages["welcome"].format(format_channel_list(self.channels)),
+            ParseMode.HTML,
+            InlineKeyboardMarkup([[InlineKeyboardButton("🔍 Verify Membership", callback_data="verify")]]),
+            disable_web_page_preview=True
+        )
+        self.help = RenderedScreen(messages["help"], ParseMode.HTML)
+        self.checking = RenderedScreen(messages["verification_start"], ParseMode.HTML)
+        self.throttled = RenderedScreen(messages["throttled"], ParseMode.HTML)
+        
+        # Join buttons for every required channel, plus the manual-access path
+        keyboard = [
+            [InlineKeyboardButton(f"📱 Join {channel['name']}", url=channel['url'])]
+            for channel in self.channels
+        ]
+        keyboard.append([InlineKeyboardButton("✅ I've Joined All Channels - Get Access Now!", callback_data="force_verify")])
+        keyboard.append([InlineKeyboardButton("🔄 Try Auto-Verify Again", callback_data="verify")])
+        self.error = RenderedScreen(
+            messages["verification_error"], ParseMode.HTML, InlineKeyboardMarkup(keyboard)
+        )
+        
+        self.unknown = RenderedScreen(
+            messages["verification_unknown"], ParseMode.HTML,
+            InlineKeyboardMarkup([[InlineKeyboardButton("🔍 Verify Again", callback_data="verify")]])
+        )
+        self.busy = RenderedScreen(
+            messages["busy"], ParseMode.HTML,
+            InlineKeyboardMarkup([[InlineKeyboardButton("🔍 Verify Again", callback_data="verify")]])
+        )
+        
+        complete_text = messages["verification_complete"].format(
+            f"[{exclusive_channel['name']}]({exclusive_channel['url']})"
+        )
+        complete_markup = InlineKeyboardMarkup(
+            [[InlineKeyboardButton("🚀 Join Now Whatsapp/Telegram OTP Grup", url=exclusive_channel['url'])]]
+        )
+        self.complete = RenderedScreen(
+            complete_text, ParseMode.MARKDOWN, complete_markup, disable_web_page_preview=True
+        )
+        self.manual_complete = RenderedScreen(
+            complete_text, ParseMode.HTML, complete_markup, disable_web_page_preview=True
+        )
+        
+        self._progress: Dict[Tuple[int, int], RenderedScreen] = {}
+        self._subsets: Dict[int, RenderedScreen] = {}
+        if len(self.channels) <= EAGER_SUBSET_LIMIT:
+            for mask in range(self.full_mask + 1):
+                self._subsets[mask] = self._build_subset(mask)
+        
+        logger.info("Render cache built with %s membership screens", len(self._subsets))
+    
+    def _build_subset(self, mask: int) -> RenderedScreen:
+        """Build the result screen for a given joined-channel bitmask."""
+        if mask == self.full_mask:
+            return self.complete
+        
+        joined = [channel for i, channel in enumerate(self.channels) if mask >> i & 1]
+        not_joined = [channel for i, channel in enumerate(self.channels) if not mask >> i & 1]
+        
+        if not joined:
+            text = self._messages["no_membership"].format(format_channel_list(self.channels))
+        else:
+            text = self._messages["partial_verification"].format(
+                len(joined),
+                len(self.channels),
+                format_remaining_channels(not_joined)
+            )
+        
+        keyboard = [
+            [InlineKeyboardButton(f"📱 Join {channel['name']}", url=channel['url'])]
+            for channel in not_joined
+        ]
+        keyboard.append([InlineKeyboardButton("🔍 Verify Again", callback_data="verify")])
+        
+        return RenderedScreen(
+            text, ParseMode.MARKDOWN, InlineKeyboardMarkup(keyboard), disable_web_page_preview=True
+        )
+    
+    def for_mask(self, mask: int) -> RenderedScreen:
+        """
+        Get the verification result screen for a joined-channel bitmask.
+        
+        Args:
+            mask: Bit i is set if the user joined channels[i]
+        
+        Returns:
+            RenderedScreen: The complete, no-membership or partial screen
+        """
+        screen = self._subsets.get(mask)
+        if screen is None:
+            screen = self._build_subset(mask)
+            if len(self._subsets) < MAX_CACHED_SUBSETS:
+                self._subsets[mask] = screen
+        return screen
+    
+    def progress(self, joined_mask: int, checking_mask: int) -> RenderedScreen:
+        """
+        Get the screen shown when some lookups didn't finish within the response budget.
+        
+        Args:
+            joined_mask: Bit i is set if the user is confirmed to have joined channels[i]
+            checking_mask: Bit i is set if channels[i] is still being checked
+        
+        Returns:
+            RenderedScreen: Joined, missing and still-checking channels, with join buttons
+                for every channel not confirmed joined
+        """
+        key = (joined_mask, checking_mask)
+        screen = self._progress.get(key)
+        if screen is not None:
+            return screen
+        
+        joined, missing, checking = [], [], []
+        for i, channel in enumerate(self.channels):
+            if joined_mask >> i & 1:
+                joined.append(channel)
+            elif checking_mask >> i & 1:
+                checking.append(channel)
+            else:
+                missing.append(channel)
+        
+        text = self._messages["verification_progress"].format(
+            *(format_channel_list(group) or "—" for group in (joined, missing, checking))
+        )
+        keyboard = [
+            [InlineKeyboardButton(f"📱 Join {channel['name']}", url=channel['url'])]
+            for channel in missing + checking
+        ]
+        keyboard.append([InlineKeyboardButton("🔍 Verify Again", callback_data="verify")])
+        screen = RenderedScreen(
+            text, ParseMode.HTML, InlineKeyboardMarkup(keyboard), disable_web_page_preview=True
+        )
+        if len(self._progress) < MAX_CACHED_SUBSETS:
+            self._progress[key] = screen
+        return screen
+    
+    def mask_for(self, joined: List[dict]) -> int:
+        """
+        Compute the joined-channel bitmask for a list of joined channels.
+        
+        Args:
+            joined: Channels the user has joined
+        
+        Returns:
+            int: Bitmask with bit i set for each joined channels[i]
+        """
+        usernames = {channel['username'] for channel in joined}
+        mask = 0
+        for i, channel in enumerate(self.channels):
+            if channel['username'] in usernames:
+                mask |= 1 << i
+        return mask
+
+def _build(config: ChannelConfig) -> RenderCache:
+    return RenderCache(config.channels, config.exclusive_channel, config.messages)
+
+# Screens for the active channel configuration, built at import time
+_render_cache = _build(current_config())
+
+def get_render_cache() -> RenderCache:
+    """
+    Get the screens for the active channel configuration.
+    
+    Handlers should call this once per update and keep the result, so every
+    screen they send comes from the same configuration snapshot.
+    """
+    return _render_cache
+
+async def _rebuild(config: ChannelConfig) -> Callable[[], None]:
+    screens = await asyncio.to_thread(_build, config)
+    
+    def install() -> None:
+        global _render_cache
+        _render_cache = screens
+    
+    return install
+
+add_reload_listener(_rebuild)
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import logging
+import time
+from typing import List, Optional
+from telegram import Bot
+from telegram.ext import Application, ContextTypes
+from config import (
+    RATE_LIMIT_OVERALL, REVERIFY_INTERVAL, REVERIFY_BATCH_SIZE,
+    REVERIFY_API_SHARE, REVERIFY_REPORT_PATH
+)
+from channel_config import current_config
+from circuit_breaker import channel_breakers
+from membership_index import get_membership_index
+from metrics import registry
+from rate_limiter import PRIORITY_BACKGROUND
+from utils import check_user_membership
+from verified_store import METHOD_AUTO, VerifiedStore, verified_store
+
+logger = logging.getLogger(__name__)
+
+# Name of the sweep's row in the checkpoint table
+CHECKPOINT_NAME = "reverification"
+
+# Per-user sweep outcomes
+RESULT_STILL_MEMBER = "still_member"
+RESULT_LEFT = "left"
+RESULT_UNDETERMINED = "undetermined"
+
+REVERIFY_RESULTS = registry.counter(
+    "bot_reverify_results_total", "Background re-verification outcomes", ["result"]
+)
+
+class ReverificationSweep:
+    """
+    Periodically re-checks users who were granted the exclusive link.
+    
+    Each job run handles one batch of users in user ID order and then saves
+    the last user ID as a checkpoint, so a restart resumes where the sweep
+    left off. Users who left a required channel lose instant access in the
+    verified store; every result is appended to a JSON Lines report.
+    """
+    
+    def __init__(self, store: VerifiedStore, interval: float, batch_size: int,
+                 calls_per_second: float, report_path: str = ""):
+        """
+        Initialize the sweep.
+        
+        Args:
+            store: Store holding the granted users and the checkpoint
+            interval: Seconds between the starts of full sweeps
+            batch_size: Users re-checked per job run
+            calls_per_second: Average getChatMember calls per second the sweep may use
+            report_path: JSON Lines report file; empty disables the report
+        """
+        self.store = store
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self.calls_per_second = calls_per_second
+        self.report_path = report_path
+        
+        self._cursor: Optional[int] = None
+        self._started_at = 0.0
+        self._finished_at = 0.0
+        self._lock = asyncio.Lock()
+    
+    def job_interval(self, channel_count: int) -> float:
+        """
+        Seconds between job runs that keep the sweep within its API budget.
+        
+        Args:
+            channel_count: Number of required channels checked per user
+        
+        Returns:
+            float: Job interval in seconds (at least one second)
+        """
+        return max(1.0, self.batch_size * max(1, channel_count) / self.calls_per_second)
+    
+    def schedule(self, application: Application) -> bool:
+        """
+        Register the sweep as a repeating job on the application's job queue.
+        
+        Args:
+            application: The application whose job queue runs the sweep
+        
+        Returns:
+            bool: True if the job was scheduled
+        """
+        if self.calls_per_second <= 0:
+            logger.warning("Re-verification sweep disabled: REVERIFY_API_SHARE must be positive")
+            return False
+        if application.job_queue is None:
+            logger.warning(
+                'Re-verification sweep needs the job queue: pip install "python-telegram-bot[job-queue]"'
+            )
+            return False
+        
+        interval = self.job_interval(len(current_config().channels))
+        application.job_queue.run_repeating(self.job, interval=interval, first=interval, name=CHECKPOINT_NAME)
+        logger.info(
+            "Re-verification sweep scheduled every %ss, %s users per batch", self.interval, self.batch_size
+        )
+        return True
+    
+    async def job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Job queue callback running one batch."""
+        await self.run_batch(context.bot)
+    
+    async def run_batch(self, bot: Bot) -> int:
+        """
+        Re-check the next batch of granted users.
+        
+        Args:
+            bot: The Telegram bot instance
+        
+        Returns:
+            int: Number of users checked
+        """
+        if self._lock.locked():
+            return 0
+        
+        async with self._lock:
+            if self._cursor is None:
+                checkpoint = await self.store.load_checkpoint(CHECKPOINT_NAME)
+                if checkpoint is not None:
+                    self._cursor, self._started_at, self._finished_at = checkpoint
+                    if self._cursor:
+                        logger.info("Resuming re-verification sweep after user %s", self._cursor)
+                else:
+                    self._cursor = 0
+            
+            now = time.time()
+            if self._cursor == 0:
+                # Between sweeps: wait until the next one is due
+                if now - self._started_at < self.interval:
+                    return 0
+                self._started_at = now
+                logger.info("Re-verification sweep started")
+            
+            users = await self.store.granted_users(self._cursor, self.batch_size)
+            if not users:
+                self._cursor = 0
+                self._finished_at = now
+                await self.store.save_checkpoint(CHECKPOINT_NAME, 0, self._started_at, self._finished_at)
+                logger.info("Re-verification sweep finished in %.0fs", now - self._started_at)
+                return 0
+            
+            lines = [await self._check_user(bot, user_id, method) for user_id, method in users]
+            if self.report_path:
+                await asyncio.to_thread(self._append_report, lines)
+            
+            self._cursor = users[-1][0]
+            await self.store.save_checkpoint(CHECKPOINT_NAME, self._cursor, self._started_at, self._finished_at)
+            return len(users)
+    
+    async def _check_user(self, bot: Bot, user_id: int, method: str) -> str:
+        """Re-check one user and return their report line."""
+        result = await check_user_membership(
+            bot, user_id,
+            index=get_membership_index(),
+            breakers=channel_breakers,
+            priority=PRIORITY_BACKGROUND if bot.rate_limiter else None
+        )
+        
+        if not result.not_joined:
+            outcome = RESULT_STILL_MEMBER
+        elif result.missing:
+            outcome = RESULT_LEFT
+            self.store.record(user_id, False, METHOD_AUTO)
+            logger.info(
+                "User %s (%s grant) left %s required channel(s)", user_id, method, len(result.missing)
+            )
+        else:
+            outcome = RESULT_UNDETERMINED
+        REVERIFY_RESULTS.inc(result=outcome)
+        
+        return json.dumps({
+            "ts": round(time.time(), 3),
+            "user_id": user_id,
+            "granted_by": method,
+            "result": outcome,
+            "missing": [channel['username'] for channel in result.missing],
+            "unverifiable": [channel['username'] for channel in result.unverifiable],
+            "unknown": [channel['username'] for channel in result.unknown],
+        }, ensure_ascii=False)
+    
+    def _append_report(self, lines: List[str]) -> None:
+        with open(self.report_path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+# Shared sweep scheduled in post_init when enabled
+reverification_sweep = ReverificationSweep(
+    verified_store, REVERIFY_INTERVAL, REVERIFY_BATCH_SIZE,
+    RATE_LIMIT_OVERALL * REVERIFY_API_SHARE, REVERIFY_REPORT_PATH
+)
@@ -11,13 +11,19 @@ Usage:
 Environment Variables:
     BOT_TOKEN - Your Telegram bot token from BotFather
     LOG_LEVEL - Logging level (DEBUG, INFO, WARNING, ERROR)
+    LOG_FORMAT - "text" (default) or "json" for one JSON object per line
+    BOT_WORKERS - Number of worker processes (default 1); with more than one,
+                  updates are sharded across workers by user ID
+    WARM_START_PATH - Snapshot of the bot identity and resolved channels that
+                      lets restarts serve without waiting on the Bot API
+                      (default warm_start.json, empty disables)
 """
 
 import sys
 import os
-import asyncio
 import logging
-from bot import create_bot
+from config import BOT_WORKERS, BOT_MODE
+from log_setup import configure_logging
 
 def main():
     """Main entry point for the bot."""
@@ -25,10 +31,7 @@ def main():
     print("=" * 40)
     
     # Configure logging
-    logging.basicConfig(
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        level=logging.INFO
-    )
+    configure_logging()
     logger = logging.getLogger(__name__)
     
     # Check if bot token is provided
@@ -48,6 +51,22 @@ def main():
         return 1
     
     try:
+        if BOT_WORKERS > 1:
+            if BOT_MODE != "polling":
+                print("❌ Error: BOT_WORKERS > 1 is only supported with BOT_MODE=polling")
+                return 1
+            
+            from sharding import run_sharded
+            print(f"🚀 Starting bot with {BOT_WORKERS} workers...")
+            print("Press Ctrl+C to stop")
+            print("-" * 40)
+            
+            run_sharded(BOT_WORKERS)
+            return 0
+        
+        # Imported here so a missing token fails fast without loading the Telegram stack
+        from bot import create_bot
+        
         # Create and run the bot
         bot = create_bot()
         logger.info("Bot created successfully")
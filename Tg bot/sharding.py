@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import time
+from typing import List, Optional
+from telegram import Bot, Update
+from telegram.error import TelegramError
+from config import (
+    BOT_TOKEN, BOT_API_BASE_URL, SHARD_HEALTH_INTERVAL, SHARD_HEARTBEAT_TIMEOUT, SHARD_QUEUE_SIZE,
+    SHARD_STOP_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+# Update fields that carry the acting user, checked in order
+_USER_PATHS = (
+    ("message", "from"),
+    ("edited_message", "from"),
+    ("callback_query", "from"),
+    ("chat_member", "new_chat_member", "user"),
+    ("my_chat_member", "from"),
+)
+
+def user_id_for_update(data: dict) -> Optional[int]:
+    """
+    Extract the acting user's ID from a raw update.
+    
+    Args:
+        data: Update as received from getUpdates (JSON dictionary)
+    
+    Returns:
+        Optional[int]: The user ID, or None if the update has no user
+    """
+    for path in _USER_PATHS:
+        node = data
+        for key in path:
+            node = node.get(key) if isinstance(node, dict) else None
+            if node is None:
+                break
+        if isinstance(node, dict) and "id" in node:
+            return node["id"]
+    return None
+
+def shard_for_update(data: dict, num_shards: int) -> int:
+    """
+    Pick the worker responsible for an update.
+    
+    Args:
+        data: Update as received from getUpdates (JSON dictionary)
+        num_shards: Number of worker processes
+    
+    Returns:
+        int: Worker index; all updates of one user map to the same worker
+    """
+    user_id = user_id_for_update(data)
+    key = user_id if user_id is not None else data.get("update_id", 0)
+    return key % num_shards
+
+def _worker_main(shard_id: int, num_workers: int, updates: multiprocessing.Queue, heartbeat) -> None:
+    """Entry point of a worker process: feed routed updates into a local application."""
+    from log_setup import configure_logging
+    from bot import TelegramVerificationBot
+    from tracing import tracer
+    
+    configure_logging(static_fields={"worker": str(shard_id)})
+    # A rotating file can't be shared between processes, so each worker writes its own
+    if tracer.path:
+        tracer.path = f"{tracer.path}.{shard_id}"
+    
+    async def serve() -> None:
+        bot = TelegramVerificationBot(BOT_TOKEN)
+        # Each worker exposes metrics on its own port after the configured one
+        if bot.metrics_port:
+            bot.metrics_port += 1 + shard_id
+        bot.run_background_jobs = shard_id == 0
+        # Telegram's flood limits are per bot token, so the workers split them
+        bot.rate_limit_share = 1 / num_workers
+        application = bot.build_application(with_updater=False)
+        loop = asyncio.get_running_loop()
+        
+        async with application:
+            if application.post_init:
+                await application.post_init(application)
+            await application.start()
+            logger.info("Worker %s ready", shard_id)
+            
+            # Always stop and run post_shutdown (store and trace flushes), also on Ctrl+C
+            try:
+                while True:
+                    heartbeat.value = time.time()
+                    try:
+                        data = await loop.run_in_executor(None, updates.get, True, 1.0)
+                    except queue.Empty:
+                        continue
+                    if data is None:
+                        break
+                    await application.update_queue.put(Update.de_json(data, application.bot))
+            finally:
+                await application.stop()
+                if application.post_shutdown:
+                    await application.post_shutdown(application)
+    
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+class ShardSupervisor:
+    """Run N worker processes and route polled updates to them by user_id."""
+    
+    def __init__(self, num_workers: int, allowed_updates: List[str]):
+        """
+        Initialize the supervisor.
+        
+        Args:
+            num_workers: Number of worker processes to run
+            allowed_updates: Update types requested from getUpdates
+        """
+        self.num_workers = num_workers
+        self.allowed_updates = allowed_updates
+        self._context = multiprocessing.get_context("spawn")
+        self._queues = [self._context.Queue(SHARD_QUEUE_SIZE) for _ in range(num_workers)]
+        self._heartbeats = [self._context.Value('d', 0.0) for _ in range(num_workers)]
+        self._workers: List[Optional[multiprocessing.Process]] = [None] * num_workers
+        self._started_at = [0.0] * num_workers
+        self._restart_delay = [0.0] * num_workers
+        self._restart_after = [0.0] * num_workers
+        self.restarts = [0] * num_workers
+    
+    def _start_worker(self, shard_id: int) -> None:
+        self._heartbeats[shard_id].value = time.time()
+        self._started_at[shard_id] = time.time()
+        worker = self._context.Process(
+            target=_worker_main,
+            args=(shard_id, self.num_workers, self._queues[shard_id], self._heartbeats[shard_id]),
+            name=f"bot-worker-{shard_id}",
+            daemon=True
+        )
+        worker.start()
+        self._workers[shard_id] = worker
+        logger.info("Started worker %s (pid %s)", shard_id, worker.pid)
+    
+    def _replace_queue(self, shard_id: int) -> None:
+        """
+        Give a worker that is being restarted a fresh queue.
+        
+        A worker killed inside Queue.get() never releases the queue's read
+        lock, so its replacement could never read from that queue again.
+        Whatever the old queue still holds is moved over if its lock is free,
+        otherwise it is dropped.
+        """
+        old = self._queues[shard_id]
+        new = self._context.Queue(SHARD_QUEUE_SIZE)
+        moved = 0
+        try:
+            while True:
+                data = old.get_nowait()
+                if data is not None:
+                    new.put_nowait(data)
+                    moved += 1
+        except (queue.Empty, queue.Full):
+            pass
+        try:
+            dropped = old.qsize()
+        except NotImplementedError:  # macOS
+            dropped = "unknown number of"
+        self._queues[shard_id] = new
+        old.close()
+        old.cancel_join_thread()
+        
+        if moved:
+            logger.info("Moved %s queued updates to the new queue of worker %s", moved, shard_id)
+        if dropped:
+            logger.warning("Dropped %s queued updates of worker %s", dropped, shard_id)
+    
+    def _enqueue(self, shard_id: int, data: dict) -> None:
+        """Put an update on a worker's queue, waiting while it is full."""
+        while True:
+            # Look the queue up on every attempt: a restart may have replaced it meanwhile
+            try:
+                self._queues[shard_id].put(data, True, 1.0)
+                return
+            except queue.Full:
+                continue
+    
+    def check_workers(self) -> None:
+        """Restart workers that exited or stopped sending heartbeats."""
+        now = time.time()
+        for shard_id, worker in enumerate(self._workers):
+            if worker is None:
+                if now >= self._restart_after[shard_id]:
+                    self.restarts[shard_id] += 1
+                    self._start_worker(shard_id)
+                continue
+            
+            if worker.is_alive():
+                if now - self._heartbeats[shard_id].value <= SHARD_HEARTBEAT_TIMEOUT:
+                    continue
+                logger.error("Worker %s missed heartbeats, terminating", shard_id)
+                worker.terminate()
+                worker.join(5)
+            else:
+                logger.error("Worker %s exited with code %s", shard_id, worker.exitcode)
+            
+            # Back off when a worker keeps crashing right after start
+            if now - self._started_at[shard_id] < 30:
+                self._restart_delay[shard_id] = min(max(1.0, self._restart_delay[shard_id] * 2), 60.0)
+            else:
+                self._restart_delay[shard_id] = 0.0
+            self._restart_after[shard_id] = now + self._restart_delay[shard_id]
+            self._workers[shard_id] = None
+            self._replace_queue(shard_id)
+            
+            if self._restart_delay[shard_id]:
+                logger.warning(
+                    "Restarting worker %s in %ss", shard_id, self._restart_delay[shard_id]
+                )
+            else:
+                self.restarts[shard_id] += 1
+                self._start_worker(shard_id)
+    
+    async def _supervise(self) -> None:
+        while True:
+            await asyncio.sleep(SHARD_HEALTH_INTERVAL)
+            self.check_workers()
+    
+    async def _route(self) -> None:
+        """Long-poll getUpdates and hand each update to its worker."""
+        loop = asyncio.get_running_loop()
+        bot = Bot(BOT_TOKEN, base_url=BOT_API_BASE_URL)
+        
+        async with bot:
+            await bot.delete_webhook(drop_pending_updates=True)
+            offset = None
+            backoff = 1.0
+            while True:
+                try:
+                    updates = await bot.get_updates(
+                        offset=offset, timeout=30, allowed_updates=self.allowed_updates
+                    )
+                    backoff = 1.0
+                except TelegramError as e:
+                    logger.warning("getUpdates failed: %s, retrying in %ss", str(e), backoff)
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 30.0)
+                    continue
+                
+                for update in updates:
+                    data = update.to_dict()
+                    shard_id = shard_for_update(data, self.num_workers)
+                    await loop.run_in_executor(None, self._enqueue, shard_id, data)
+                    offset = update.update_id + 1
+    
+    async def _serve(self) -> None:
+        supervisor = asyncio.create_task(self._supervise())
+        try:
+            await self._route()
+        finally:
+            supervisor.cancel()
+    
+    def run(self) -> None:
+        """Start all workers and route updates until interrupted."""
+        for shard_id in range(self.num_workers):
+            self._start_worker(shard_id)
+        
+        try:
+            asyncio.run(self._serve())
+        finally:
+            self.stop()
+    
+    def stop(self) -> None:
+        """Ask workers to finish and wait for them to exit, terminating those that don't."""
+        logger.info("Stopping %s workers...", self.num_workers)
+        for shard_id, worker in enumerate(self._workers):
+            if worker is None or not worker.is_alive():
+                continue
+            try:
+                self._queues[shard_id].put(None, True, SHARD_STOP_TIMEOUT)
+            except queue.Full:
+                # A hung worker never makes room for the stop request
+                logger.error("Worker %s did not take its stop request, terminating", shard_id)
+                worker.terminate()
+        
+        for shard_id, worker in enumerate(self._workers):
+            if worker is None:
+                continue
+            worker.join(SHARD_STOP_TIMEOUT)
+            if worker.is_alive():
+                logger.error("Worker %s did not exit, terminating", shard_id)
+                worker.terminate()
+                worker.join(5)
+            # Updates no worker will read must not keep this process from exiting
+            self._queues[shard_id].cancel_join_thread()
+
+def run_sharded(num_workers: int) -> None:
+    """
+    Run the bot as a router process plus worker processes.
+    
+    Args:
+        num_workers: Number of worker processes to start
+    """
+    from bot import create_bot
+    
+    allowed_updates = create_bot().allowed_updates()
+    ShardSupervisor(num_workers, allowed_updates).run()
@@ -0,0 +1,60 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into a single execution."""
+    
+    def __init__(self):
+        """Initialize an empty in-flight table."""
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+    
+    def in_flight(self, key: Hashable) -> bool:
+        """Check whether a call for the given key is currently running."""
+        return key in self._calls
+    
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Run func for key, or wait for the run already in flight.
+        
+        Args:
+            key: Deduplication key (e.g. a user ID)
+            func: Zero-argument coroutine function doing the actual work
+        
+        Returns:
+            Tuple[T, bool]: The result and whether this caller executed func
+        
+        Note:
+            The in-flight entry is removed as soon as the leading call finishes,
+            fails or is cancelled, so later calls always start a fresh run.
+            Waiting callers share the leader's result or exception.
+        """
+        existing = self._calls.get(key)
+        if existing is not None:
+            self.coalesced += 1
+            return await asyncio.shield(existing), False
+        
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.executions += 1
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, True
+        finally:
+            del self._calls[key]
+    
+    def __len__(self) -> int:
+        return len(self._calls)
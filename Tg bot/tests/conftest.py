@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Tests import the bot modules directly and must not touch real files, ports or tokens
+os.environ.setdefault("BOT_TOKEN", "123456:TEST")
+os.environ.update(
+    VERIFIED_STORE_PATH="", METRICS_PORT="0", WARM_START_PATH="", TRACE_PATH="",
+    CHANNELS_CONFIG_PATH="", USER_THROTTLE_RATE="0"
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,60 @@
+import asyncio
+from telegram.error import BadRequest, TimedOut
+from circuit_breaker import STATE_CLOSED, STATE_OPEN, BreakerRegistry
+from config import BREAKER_FAILURE_THRESHOLD
+from utils import STATUS_NOT_JOINED, STATUS_UNVERIFIABLE, _check_channel
+
+CHANNEL = {"username": "private_channel"}
+
+class FakeBot:
+    """Bot stand-in whose get_chat_member raises the given error for every call."""
+    
+    def __init__(self, error: Exception):
+        self.error = error
+        self.calls = 0
+    
+    async def get_chat_member(self, chat_id, user_id, **kwargs):
+        self.calls += 1
+        raise self.error
+
+def check(bot, breakers=None) -> str:
+    async def run():
+        return await _check_channel(bot, 1, CHANNEL, asyncio.Semaphore(1), breakers=breakers)
+    return asyncio.run(run())
+
+def test_inaccessible_member_list_is_unverifiable_and_not_retried():
+    bot = FakeBot(BadRequest("Member list is inaccessible"))
+    assert check(bot) == STATUS_UNVERIFIABLE
+    assert bot.calls == 1
+
+def test_user_not_found_is_not_joined_and_not_retried():
+    bot = FakeBot(BadRequest("User not found"))
+    assert check(bot) == STATUS_NOT_JOINED
+    assert bot.calls == 1
+
+def test_timeouts_are_still_retried():
+    bot = FakeBot(TimedOut())
+    check(bot)
+    assert bot.calls > 1
+
+def test_privacy_errors_open_the_breaker_after_the_threshold():
+    breakers = BreakerRegistry(failure_threshold=BREAKER_FAILURE_THRESHOLD, cooldown=60)
+    bot = FakeBot(BadRequest("Member list is inaccessible"))
+    for _ in range(BREAKER_FAILURE_THRESHOLD - 1):
+        assert check(bot, breakers) == STATUS_UNVERIFIABLE
+    assert breakers.get(CHANNEL["username"]).state == STATE_CLOSED
+    
+    check(bot, breakers)
+    assert breakers.get(CHANNEL["username"]).state == STATE_OPEN
+    
+    # Open: further checks skip the API
+    assert check(bot, breakers) == STATUS_UNVERIFIABLE
+    assert bot.calls == BREAKER_FAILURE_THRESHOLD
+
+def test_failed_half_open_probe_reopens_the_breaker():
+    breakers = BreakerRegistry(cooldown=0)
+    breaker = breakers.get(CHANNEL["username"])
+    breaker.trip()
+    
+    check(FakeBot(TimedOut()), breakers)
+    assert breaker.state == STATE_OPEN
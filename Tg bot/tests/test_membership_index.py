@@ -0,0 +1,25 @@
+import membership_index
+from membership_index import MAX_INDEXED_CHANNELS, build_membership_index, get_membership_index
+
+def test_too_many_channels_turns_the_index_off():
+    usernames = [f"channel{i}" for i in range(MAX_INDEXED_CHANNELS + 1)]
+    assert build_membership_index(usernames) is None
+
+def test_index_is_built_for_supported_channel_counts():
+    index = build_membership_index(["a", "b"])
+    index.set_observable("b", True)
+    index.record(1, "b", True)
+    assert index.lookup(1, "b") is True
+    assert index.lookup(1, "a") is None
+
+def test_no_index_unless_enabled(monkeypatch):
+    monkeypatch.setattr(membership_index, "MEMBERSHIP_INDEX_ENABLED", False)
+    assert get_membership_index() is None
+
+def test_index_is_built_lazily_from_the_active_config(monkeypatch):
+    monkeypatch.setattr(membership_index, "MEMBERSHIP_INDEX_ENABLED", True)
+    monkeypatch.setattr(membership_index, "_membership_index", None)
+    monkeypatch.setattr(membership_index, "_membership_index_built", False)
+    index = get_membership_index()
+    assert index is not None
+    assert get_membership_index() is index
@@ -0,0 +1,30 @@
+import pytest
+from metrics import Registry, _Metric
+
+def test_counter_callbacks_are_exported_as_counters():
+    totals = {"1": 2.5}
+    metrics = Registry()
+    metrics.counter(
+        "bot_api_queue_wait_seconds_total", "Total wait", ["priority"],
+        callback=lambda: {(priority,): total for priority, total in totals.items()}
+    )
+    totals["1"] += 1.0
+    
+    lines = metrics.render().splitlines()
+    assert "# TYPE bot_api_queue_wait_seconds_total counter" in lines
+    assert 'bot_api_queue_wait_seconds_total{priority="1"} 3.5' in lines
+
+def test_failing_callback_renders_no_samples():
+    def broken():
+        raise RuntimeError("gone")
+    
+    metrics = Registry()
+    metrics.gauge("bot_broken", "Broken", callback=broken)
+    assert metrics.render().splitlines()[-1] == "# TYPE bot_broken gauge"
+
+def test_metric_without_samples_cannot_be_created():
+    class Incomplete(_Metric):
+        pass
+    
+    with pytest.raises(TypeError):
+        Incomplete("bot_incomplete", "Incomplete")
@@ -0,0 +1,23 @@
+import time
+import sharding
+from sharding import ShardSupervisor, shard_for_update
+
+def test_updates_of_one_user_go_to_the_same_shard():
+    update = {"update_id": 1, "message": {"from": {"id": 123456789}}}
+    callback = {"update_id": 2, "callback_query": {"from": {"id": 123456789}}}
+    assert shard_for_update(update, 4) == shard_for_update(callback, 4)
+
+def test_stop_terminates_a_hung_worker_with_a_full_queue(monkeypatch):
+    monkeypatch.setattr(sharding, "SHARD_QUEUE_SIZE", 1)
+    monkeypatch.setattr(sharding, "SHARD_STOP_TIMEOUT", 0.5)
+    supervisor = ShardSupervisor(1, [])
+    # A worker that never reads its queue, behind a queue with no room for the stop request
+    worker = supervisor._context.Process(target=time.sleep, args=(60,), daemon=True)
+    worker.start()
+    supervisor._workers[0] = worker
+    supervisor._queues[0].put({"update_id": 1})
+    
+    started = time.monotonic()
+    supervisor.stop()
+    assert time.monotonic() - started < 10
+    assert not worker.is_alive()
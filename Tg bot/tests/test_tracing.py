@@ -0,0 +1,30 @@
+import json
+import pytest
+from tracing import Tracer
+
+@pytest.fixture
+def tracer(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(str(path), sample_rate=1.0, slow_threshold=0, max_bytes=1 << 20, backup_count=1)
+    tracer.start()
+    yield tracer
+    tracer.stop()
+
+def exported(tracer):
+    tracer.stop()
+    with open(tracer.path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_child_span_outside_a_trace_exports_nothing(tracer):
+    with tracer.child_span("send_message") as span:
+        span.set(ignored=True)
+    assert exported(tracer) == []
+
+def test_child_span_joins_the_current_trace(tracer):
+    with tracer.span("verify_callback"):
+        with tracer.child_span("edit_message_text"):
+            pass
+    traces = exported(tracer)
+    assert len(traces) == 1
+    assert [span["name"] for span in traces[0]["spans"]] == ["verify_callback", "edit_message_text"]
+    assert traces[0]["spans"][1]["parent"] == traces[0]["spans"][0]["id"]
@@ -0,0 +1,57 @@
+import asyncio
+from telegram import Chat, Message, Update, User
+from update_processor import PerUserUpdateProcessor
+
+def message_update(update_id: int, user_id: int) -> Update:
+    user = User(user_id, "User", False)
+    message = Message(update_id, None, Chat(user_id, Chat.PRIVATE), from_user=user, text="/start")
+    return Update(update_id, message=message)
+
+def run_updates(processor: PerUserUpdateProcessor, users, delay: float = 0.01):
+    """Process one update per user ID in order, recording when each starts and ends."""
+    events = []
+    running = [0]
+    peak = [0]
+    
+    async def handle(update_id: int, user_id: int):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        events.append(("start", user_id, update_id))
+        await asyncio.sleep(delay)
+        events.append(("end", user_id, update_id))
+        running[0] -= 1
+    
+    async def run():
+        async with processor:
+            tasks = [
+                asyncio.create_task(processor.process_update(message_update(i, user), handle(i, user)))
+                for i, user in enumerate(users)
+            ]
+            await asyncio.gather(*tasks)
+    
+    asyncio.run(run())
+    return events, peak[0]
+
+def test_updates_of_one_user_run_in_order_one_at_a_time():
+    processor = PerUserUpdateProcessor(8)
+    events, peak = run_updates(processor, [1] * 5)
+    assert events == [(kind, 1, i) for i in range(5) for kind in ("start", "end")]
+    assert peak == 1
+    assert processor.processed == 5
+    assert processor.active_users == 0
+
+def test_different_users_run_concurrently_within_the_slot_limit():
+    processor = PerUserUpdateProcessor(3)
+    events, peak = run_updates(processor, [1, 2, 3, 4, 5, 6])
+    assert peak == 3
+    assert processor.processed == 6
+
+def test_interleaved_users_keep_their_own_order():
+    processor = PerUserUpdateProcessor(4)
+    users = [1, 2, 1, 3, 2, 1, 3]
+    events, _ = run_updates(processor, users)
+    for user in set(users):
+        started = [update_id for kind, user_id, update_id in events if kind == "start" and user_id == user]
+        assert started == [i for i, u in enumerate(users) if u == user]
+    assert processor.waiting_for_user == 0
+    assert processor.running == 0
@@ -0,0 +1,62 @@
+import asyncio
+import time
+from verified_store import METHOD_AUTO, VerifiedStore
+
+def make_store(tmp_path, **kwargs) -> VerifiedStore:
+    return VerifiedStore(str(tmp_path / "verified.db"), 3600, flush_interval=0.01, **kwargs)
+
+def test_stop_writes_queued_outcomes(tmp_path):
+    async def run():
+        store = make_store(tmp_path)
+        await store.start()
+        store.record(1, True)
+        store.record(2, False)
+        await store.stop()
+        
+        reopened = make_store(tmp_path)
+        await reopened.start()
+        try:
+            return store, await reopened.get(1), await reopened.get(2)
+        finally:
+            await reopened.stop()
+    
+    store, first, second = asyncio.run(run())
+    assert store.records_written == 2
+    assert first[:2] == (True, METHOD_AUTO)
+    assert second[0] is False
+
+def test_stop_returns_when_the_writer_has_died(tmp_path):
+    async def run():
+        store = make_store(tmp_path)
+        await store.start()
+        
+        def broken(rows):
+            raise RuntimeError("disk gone")
+        
+        store._write_batch = broken
+        store.record(1, True)
+        await asyncio.sleep(0.1)
+        store.record(2, True)
+        await asyncio.wait_for(store.stop(), 5)
+        return store
+    
+    store = asyncio.run(run())
+    assert not store.started
+    assert store.records_written == 0
+
+def test_stop_gives_up_on_a_stuck_writer(tmp_path):
+    async def run():
+        store = make_store(tmp_path, stop_timeout=0.2)
+        await store.start()
+        
+        def stuck(rows):
+            time.sleep(0.5)
+        
+        store._write_batch = stuck
+        store.record(1, True)
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(store.stop(), 5)
+        return store
+    
+    store = asyncio.run(run())
+    assert not store.started
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+import httpx
+from benchmarks.fake_bot_api import FakeBotApi, command_update
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET = "webhook-test-secret"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def post_updates(api: FakeBotApi) -> dict:
+    """Run the bot in webhook mode against the fake API and post updates to it."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/telegram"
+    env = dict(
+        os.environ, BOT_API_BASE_URL=api.base_url, BOT_MODE="webhook", BOT_WORKERS="1",
+        WEBHOOK_LISTEN="127.0.0.1", WEBHOOK_PORT=str(port), WEBHOOK_PATH="telegram",
+        WEBHOOK_URL="https://bot.example.com/telegram", WEBHOOK_SECRET_TOKEN=SECRET, LOG_LEVEL="WARNING"
+    )
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "run.py", cwd=BOT_DIR, env=env,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+    )
+    results = {}
+    try:
+        async with httpx.AsyncClient() as client:
+            # Wait until the webhook is registered and the server accepts connections
+            deadline = time.monotonic() + 30
+            while True:
+                if process.returncode is not None or time.monotonic() > deadline:
+                    raise RuntimeError("bot did not start serving the webhook")
+                if api.calls["setWebhook"]:
+                    try:
+                        await client.get(url)
+                        break
+                    except httpx.TransportError:
+                        pass
+                await asyncio.sleep(0.05)
+            
+            body = json.dumps(command_update(1, 1001, "/start"))
+            headers = {"Content-Type": "application/json"}
+            results["without_secret"] = (await client.post(url, content=body, headers=headers)).status_code
+            results["wrong_secret"] = (await client.post(
+                url, content=body, headers={**headers, "X-Telegram-Bot-Api-Secret-Token": "wrong"}
+            )).status_code
+            results["sent_before"] = api.calls["sendMessage"]
+            results["with_secret"] = (await client.post(
+                url, content=body, headers={**headers, "X-Telegram-Bot-Api-Secret-Token": SECRET}
+            )).status_code
+            
+            deadline = time.monotonic() + 10
+            while api.calls["sendMessage"] == results["sent_before"] and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            results["sent_after"] = api.calls["sendMessage"]
+    finally:
+        if process.returncode is None:
+            process.terminate()
+        await process.wait()
+    return results
+
+def test_webhook_checks_the_secret_and_dispatches_updates():
+    async def run():
+        api = FakeBotApi(rtt=0.0)
+        await api.start()
+        try:
+            return api, await post_updates(api)
+        finally:
+            await api.stop()
+    
+    api, results = asyncio.run(run())
+    assert api.calls["setWebhook"] == 1
+    assert results["without_secret"] == 403
+    assert results["wrong_secret"] == 403
+    # Rejected posts never reach the handlers
+    assert results["sent_before"] == 0
+    assert results["with_secret"] == 200
+    assert results["sent_after"] == 1
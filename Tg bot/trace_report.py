@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Summarize verification traces written by the bot (TRACE_PATH).
+
+Lists the slowest traces with the critical path of each: the chain of spans
+that actually determined how long the user waited. Time a span spent
+neither waiting on a child nor in parallel work is shown as "(self)". Also
+prints where critical-path time went across all matching traces.
+
+Usage:
+    python trace_report.py traces.jsonl traces.jsonl.1 --top 10
+    python trace_report.py traces.jsonl --user 123456789
+    python trace_report.py traces.jsonl --trace 5f0c2a9e1b3d4c7a
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="trace files, including rotated ones")
+    parser.add_argument("--top", type=int, default=10, help="slowest traces to show")
+    parser.add_argument("--user", type=int, help="only traces of this user ID")
+    parser.add_argument("--root", help="only traces starting with this span, e.g. verify_callback")
+    parser.add_argument("--min-ms", type=float, default=0.0, help="only traces at least this slow")
+    parser.add_argument("--trace", help="print every span of one trace")
+    return parser.parse_args()
+
+def load_traces(paths: Iterable[str]) -> List[dict]:
+    """Read traces from JSONL files, skipping lines that aren't valid JSON."""
+    traces = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    traces.append(json.loads(line))
+                except ValueError:
+                    continue
+    return traces
+
+def trace_user(trace: dict):
+    """The user a trace belongs to, from the first span that recorded one."""
+    for span in trace["spans"]:
+        if "user_id" in span["attributes"]:
+            return span["attributes"]["user_id"]
+    return None
+
+def trace_outcome(trace: dict) -> str:
+    for span in trace["spans"]:
+        if "outcome" in span["attributes"]:
+            return span["attributes"]["outcome"]
+    return "-"
+
+def span_label(span: dict) -> str:
+    channel = span["attributes"].get("channel")
+    return f"{span['name']} @{channel}" if channel else span["name"]
+
+def _end(span: dict) -> float:
+    return span["start_ms"] + span["duration_ms"]
+
+def critical_path(trace: dict) -> List[Tuple[dict, float, bool]]:
+    """
+    Find the spans that determined a trace's duration.
+    
+    Walking back from the end of a span, the child that finished last is the
+    one the span was waiting on; before that child started, the next child
+    to finish is, and so on. Remaining gaps are the span's own time.
+    
+    Args:
+        trace: A trace as written by the tracer
+    
+    Returns:
+        List[Tuple[dict, float, bool]]: (span, milliseconds, is_self_time) in time order
+    """
+    children: Dict[int, List[dict]] = defaultdict(list)
+    root = None
+    for span in trace["spans"]:
+        if span["duration_ms"] is None:
+            # Still running when the trace was exported, so it didn't hold up the reply
+            continue
+        if span["parent"] is None:
+            root = span
+        else:
+            children[span["parent"]].append(span)
+    if root is None:
+        return []
+    
+    def walk(span: dict) -> List[Tuple[dict, float, bool]]:
+        segments: List[Tuple[dict, float, bool]] = []
+        cursor = _end(span)
+        for child in sorted(children[span["id"]], key=_end, reverse=True):
+            if _end(child) > cursor + 1e-6:
+                continue  # overlapped with the child already on the path
+            if cursor - _end(child) > 0:
+                segments.append((span, cursor - _end(child), True))
+            segments.extend(reversed(walk(child)))
+            cursor = child["start_ms"]
+        if cursor - span["start_ms"] > 0:
+            segments.append((span, cursor - span["start_ms"], True))
+        return list(reversed(segments))
+    
+    path = walk(root)
+    # Leaf spans have only self time; report them as the operation itself. Self
+    # time below the files' 1 us resolution is rounding noise between spans.
+    leaves = {span["id"] for span in trace["spans"] if not children[span["id"]]}
+    return [
+        (span, ms, is_self and span["id"] not in leaves) for span, ms, is_self in path
+        if ms >= 0.05 or not is_self or span["id"] in leaves
+    ]
+
+def print_trace(trace: dict) -> None:
+    """Print every span of a trace as an indented tree."""
+    by_parent: Dict[int, List[dict]] = defaultdict(list)
+    for span in trace["spans"]:
+        by_parent[span["parent"]].append(span)
+    
+    def show(parent, depth: int) -> None:
+        for span in sorted(by_parent[parent], key=lambda s: s["start_ms"]):
+            duration = "running" if span["duration_ms"] is None else f"{span['duration_ms']:.1f} ms"
+            attributes = " ".join(f"{key}={value}" for key, value in span["attributes"].items())
+            print(f"  {span['start_ms']:9.1f} ms  {'  ' * depth}{span['name']} [{duration}, {span['status']}] {attributes}")
+            show(span["id"], depth + 1)
+    
+    print(f"Trace {trace['trace_id']} at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(trace['ts']))}, "
+          f"{trace['duration_ms']:.1f} ms")
+    show(None, 0)
+
+def main() -> int:
+    args = parse_args()
+    traces = load_traces(args.paths)
+    
+    if args.trace:
+        for trace in traces:
+            if trace["trace_id"] == args.trace:
+                print_trace(trace)
+                return 0
+        print(f"Trace {args.trace} not found")
+        return 1
+    
+    traces = [
+        trace for trace in traces
+        if (args.user is None or trace_user(trace) == args.user)
+        and (args.root is None or trace["root"] == args.root)
+        and trace["duration_ms"] >= args.min_ms
+    ]
+    if not traces:
+        print("No matching traces")
+        return 1
+    traces.sort(key=lambda trace: trace["duration_ms"], reverse=True)
+    
+    durations = sorted(trace["duration_ms"] for trace in traces)
+    print(f"{len(traces)} traces, median {durations[len(durations) // 2]:.1f} ms, "
+          f"max {durations[-1]:.1f} ms ({sum(1 for trace in traces if trace.get('slow'))} over the slow threshold)")
+    
+    # Where critical-path time went across all matching traces
+    totals: Dict[str, float] = defaultdict(float)
+    for trace in traces:
+        for span, ms, is_self in critical_path(trace):
+            totals[span["name"] + (" (self)" if is_self else "")] += ms
+    overall = sum(totals.values()) or 1.0
+    print("\nCritical path breakdown:")
+    for name, ms in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+        if ms / len(traces) < 0.05:
+            continue
+        print(f"  {name:36} {ms / len(traces):9.1f} ms/trace  {ms / overall * 100:5.1f}%")
+    
+    print(f"\nSlowest {min(args.top, len(traces))} traces:")
+    for trace in traces[:args.top]:
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(trace["ts"]))
+        print(f"\n  {trace['duration_ms']:9.1f} ms  {trace['root']}  user {trace_user(trace)}  "
+              f"outcome {trace_outcome(trace)}  {started}  trace {trace['trace_id']}")
+        for span, ms, is_self in critical_path(trace):
+            label = span_label(span) + (" (self)" if is_self else "")
+            details = "" if is_self else " ".join(
+                f"{key}={value}" for key, value in span["attributes"].items() if key != "channel"
+            )
+            print(f"    {ms:9.1f} ms  {label:40} {details}".rstrip())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+from config import TRACE_PATH, TRACE_SAMPLE_RATE, TRACE_SLOW_THRESHOLD, TRACE_MAX_BYTES, TRACE_BACKUP_COUNT
+from log_setup import DeferredQueueHandler
+
+logger = logging.getLogger(__name__)
+
+class Trace:
+    """Spans of one verification, kept in memory until the root span ends."""
+    
+    __slots__ = ("trace_id", "started_at", "origin", "spans", "finished")
+    
+    def __init__(self):
+        self.trace_id = f"{random.getrandbits(64):016x}"
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.spans: List["Span"] = []
+        self.finished = False
+
+class Span:
+    """A timed operation within a trace."""
+    
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attributes", "status", "start", "end")
+    
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[int], attributes: dict):
+        self.trace = trace
+        self.span_id = len(trace.spans) + 1
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.status = "ok"
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        trace.spans.append(self)
+    
+    def set(self, **attributes) -> None:
+        """Add or overwrite attributes."""
+        self.attributes.update(attributes)
+    
+    def to_dict(self) -> dict:
+        origin = self.trace.origin
+        return {
+            "id": self.span_id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            # Spans still running when the trace was exported (e.g. background lookups) have no duration
+            "duration_ms": round((self.end - self.start) * 1000, 3) if self.end is not None else None,
+            "status": self.status,
+            "attributes": dict(self.attributes),
+        }
+
+class _NoopSpan:
+    """Stand-in returned while tracing is disabled."""
+    
+    __slots__ = ()
+    
+    def set(self, **attributes) -> None:
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+def current_span():
+    """Get the innermost active span, or a no-op span outside any trace."""
+    return _current_span.get() or _NOOP_SPAN
+
+class _TraceFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg, ensure_ascii=False, default=str)
+
+class Tracer:
+    """
+    Span-based tracing of verifications, exported as one JSON line per trace.
+    
+    The active span is held in a context variable, so spans opened in tasks
+    created by a traced coroutine (such as the per-channel lookups) join the
+    same trace. A trace is exported when its root span ends: a random
+    TRACE_SAMPLE_RATE share of traces, plus every trace slower than
+    TRACE_SLOW_THRESHOLD. Export goes through a queue to a background thread
+    writing a rotating file, like the logs, so the event loop never waits on
+    serialization or disk I/O.
+    """
+    
+    def __init__(self, path: str, sample_rate: float, slow_threshold: float,
+                 max_bytes: int, backup_count: int):
+        """
+        Initialize the tracer.
+        
+        Args:
+            path: JSONL file traces are written to; empty disables tracing
+            sample_rate: Fraction of traces exported regardless of duration
+            slow_threshold: Seconds above which a trace is always exported (0 disables)
+            max_bytes: Size at which the file is rotated
+            backup_count: Rotated files kept
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.exported = 0
+        self.discarded = 0
+        self._logger: Optional[logging.Logger] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether traces are being recorded."""
+        return self._logger is not None
+    
+    def start(self) -> None:
+        """Open the trace file and start the background writer; does nothing if no path is set."""
+        if not self.path or self._listener is not None:
+            return
+        output = logging.handlers.RotatingFileHandler(
+            self.path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding="utf-8"
+        )
+        output.setFormatter(_TraceFormatter())
+        records = queue.SimpleQueue()
+        
+        trace_logger = logging.getLogger("bot.traces")
+        trace_logger.propagate = False
+        trace_logger.setLevel(logging.INFO)
+        trace_logger.addHandler(DeferredQueueHandler(records))
+        
+        self._listener = logging.handlers.QueueListener(records, output)
+        self._listener.start()
+        self._logger = trace_logger
+        logger.info(
+            "Tracing to %s (sample rate %s, slow threshold %ss)", self.path, self.sample_rate, self.slow_threshold
+        )
+    
+    def stop(self) -> None:
+        """Flush queued traces and stop the background writer."""
+        if self._listener is None:
+            return
+        for handler in list(self._logger.handlers):
+            self._logger.removeHandler(handler)
+        self._logger = None
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+        self._listener = None
+    
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator:
+        """
+        Time a block as a span of the current trace, starting a trace if there is none.
+        
+        Args:
+            name: Span name, e.g. "get_chat_member"
+            **attributes: Initial attributes
+        
+        Yields:
+            Span: The span, for adding attributes; a no-op span while disabled
+        """
+        if self._logger is None:
+            yield _NOOP_SPAN
+            return
+        
+        parent = _current_span.get()
+        if parent is None:
+            span = Span(Trace(), name, None, attributes)
+        elif parent.trace.finished:
+            # Work outliving its trace (e.g. a retry of a background lookup) isn't recorded
+            yield _NOOP_SPAN
+            return
+        else:
+            span = Span(parent.trace, name, parent.span_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except asyncio.CancelledError:
+            span.status = "cancelled"
+            raise
+        except BaseException as e:
+            span.status = "error"
+            span.attributes.setdefault("error", type(e).__name__)
+            raise
+        finally:
+            span.end = time.perf_counter()
+            _current_span.reset(token)
+            if span.parent_id is None:
+                self._finish(span)
+    
+    @contextmanager
+    def child_span(self, name: str, **attributes) -> Iterator:
+        """
+        Time a block as a span of the current trace, without starting a trace.
+        
+        For operations shared by verifications and untraced replies (such as
+        /help), which would otherwise each be exported as a one-span trace.
+        
+        Args:
+            name: Span name
+            **attributes: Initial attributes
+        
+        Yields:
+            Span: The span, or a no-op span outside any trace
+        """
+        if _current_span.get() is None:
+            yield _NOOP_SPAN
+            return
+        with self.span(name, **attributes) as span:
+            yield span
+    
+    def _finish(self, root: Span) -> None:
+        trace = root.trace
+        trace.finished = True
+        duration = root.end - root.start
+        slow = self.slow_threshold > 0 and duration >= self.slow_threshold
+        if not slow and random.random() >= self.sample_rate:
+            self.discarded += 1
+            return
+        if self._logger is None:
+            return
+        
+        self.exported += 1
+        # Serialized by the writer thread; spans still running are snapshotted now
+        self._logger.info({
+            "trace_id": trace.trace_id,
+            "ts": round(trace.started_at, 6),
+            "root": root.name,
+            "duration_ms": round(duration * 1000, 3),
+            "slow": slow,
+            "attributes": dict(root.attributes),
+            "spans": [span.to_dict() for span in trace.spans],
+        })
+
+def traced(name: str, result_attribute: Optional[str] = None, root: bool = True) -> Callable:
+    """
+    Decorator running an async function inside a span of the shared tracer.
+    
+    Args:
+        name: Span name
+        result_attribute: Optional attribute the return value is recorded under
+        root: Whether a call outside any trace starts one; if False it is only
+            recorded as part of an existing trace
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with (tracer.span if root else tracer.child_span)(name) as span:
+                result = await func(*args, **kwargs)
+                if result_attribute:
+                    span.set(**{result_attribute: result})
+                return result
+        return wrapper
+    return decorator
+
+# Shared tracer; started by the bot once the application is initialized
+tracer = Tracer(TRACE_PATH, TRACE_SAMPLE_RATE, TRACE_SLOW_THRESHOLD, TRACE_MAX_BYTES, TRACE_BACKUP_COUNT)
@@ -0,0 +1,79 @@
+import time
+from collections import OrderedDict
+from typing import Tuple
+from config import USER_THROTTLE_RATE, USER_THROTTLE_BURST, USER_THROTTLE_MAX_USERS
+
+class UserThrottle:
+    """
+    Per-user token buckets in a memory-bounded LRU table.
+    
+    Each entry is a (tokens, updated_at, notice_until) tuple rather than an
+    object, so a large table stays small. A user evicted from the table starts
+    again with a full bucket.
+    """
+    
+    def __init__(self, rate: float, burst: float, max_users: int):
+        """
+        Initialize the throttle.
+        
+        Args:
+            rate: Requests per second each user may sustain
+            burst: Requests a user may make back to back
+            max_users: Maximum number of users tracked
+        """
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_users = max(1, max_users)
+        self.allowed = 0
+        self.throttled = 0
+        self.evictions = 0
+        self._buckets: "OrderedDict[int, Tuple[float, float, float]]" = OrderedDict()
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether throttling is configured."""
+        return self.rate > 0
+    
+    def check(self, user_id: int) -> Tuple[bool, bool]:
+        """
+        Take a token for a request from a user.
+        
+        Args:
+            user_id: The user ID
+        
+        Returns:
+            Tuple[bool, bool]: (allowed, notify). notify is True for the first
+                throttled request until the user's bucket has a token again, so
+                a user who keeps hammering is told only once.
+        """
+        now = time.monotonic()
+        entry = self._buckets.get(user_id)
+        if entry is None:
+            tokens, notice_until = self.burst, 0.0
+        else:
+            tokens, updated_at, notice_until = entry
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            self._buckets.move_to_end(user_id)
+        
+        if tokens >= 1:
+            self._buckets[user_id] = (tokens - 1, now, 0.0)
+            allowed, notify = True, False
+            self.allowed += 1
+        else:
+            notify = now >= notice_until
+            if notify:
+                notice_until = now + (1 - tokens) / self.rate
+            self._buckets[user_id] = (tokens, now, notice_until)
+            allowed = False
+            self.throttled += 1
+        
+        while len(self._buckets) > self.max_users:
+            self._buckets.popitem(last=False)
+            self.evictions += 1
+        return allowed, notify
+    
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+# Shared throttle for commands and callbacks
+user_throttle = UserThrottle(USER_THROTTLE_RATE, USER_THROTTLE_BURST, USER_THROTTLE_MAX_USERS)
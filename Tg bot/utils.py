@@ -1,86 +1,442 @@
+import asyncio
 import logging
+import random
+import time
+from datetime import timedelta
 from telegram import Bot
-from telegram.error import TelegramError
-from typing import List, Tuple, Optional
-from config import REQUIRED_CHANNELS
-
-# Configure logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
+from typing import Dict, List, Sequence, Set, Optional, Union
+from channel_config import current_config
+from circuit_breaker import BreakerRegistry, CircuitBreaker
+from config import (
+    MEMBERSHIP_CHECK_CONCURRENCY, MEMBERSHIP_CHECK_TIMEOUT, MEMBERSHIP_CHECK_DEADLINE,
+    MEMBERSHIP_RETRY_ATTEMPTS, MEMBERSHIP_RETRY_BASE_DELAY, MEMBERSHIP_RETRY_MAX_DELAY
 )
+from membership_cache import MembershipCache
+from membership_index import MembershipIndex
+from metrics import GET_CHAT_MEMBER_LATENCY, MEMBERSHIP_ERRORS, MEMBERSHIP_LOOKUPS, MEMBERSHIP_RETRIES
+from tracing import current_span, traced, tracer
+
 logger = logging.getLogger(__name__)
 
-async def check_user_membership(bot: Bot, user_id: int) -> Tuple[List[dict], List[dict]]:
+# Error classes reported by classify_membership_error
+ERROR_PRIVACY = "privacy"
+ERROR_FORBIDDEN = "forbidden"
+ERROR_BAD_REQUEST = "bad_request"
+ERROR_USER_NOT_FOUND = "user_not_found"
+ERROR_OTHER = "other"
+
+# Error classes that mean the bot can't read the channel's member list
+BREAKER_ERRORS = (ERROR_PRIVACY, ERROR_FORBIDDEN)
+
+# Per-channel outcomes of a membership check
+STATUS_JOINED = "joined"
+STATUS_NOT_JOINED = "not_joined"
+STATUS_UNVERIFIABLE = "unverifiable"
+STATUS_UNKNOWN = "unknown"
+
+class ChannelInfo:
+    """Resolved facts about a required channel, filled in by the startup preflight."""
+    
+    __slots__ = ("username", "chat_id", "title", "is_admin", "error")
+    
+    def __init__(self, username: str, chat_id: Optional[int] = None, title: Optional[str] = None,
+                 is_admin: bool = False, error: Optional[str] = None):
+        self.username = username
+        self.chat_id = chat_id
+        self.title = title
+        self.is_admin = is_admin
+        self.error = error
+    
+    @property
+    def can_verify(self) -> bool:
+        """Whether the bot can read other users' membership in this channel."""
+        return self.chat_id is not None and self.is_admin
+
+# Preflight results keyed by lower-case channel username
+channel_registry: Dict[str, ChannelInfo] = {}
+
+def chat_id_for(channel: dict) -> Union[int, str]:
+    """
+    Get the chat ID to use in API calls for a channel.
+    
+    Args:
+        channel: Channel dictionary containing 'username'
+    
+    Returns:
+        Union[int, str]: The numeric chat ID if resolved, otherwise "@username"
+    """
+    info = channel_registry.get(channel['username'].lower())
+    if info is not None and info.chat_id is not None:
+        return info.chat_id
+    return f"@{channel['username']}"
+
+def classify_membership_error(error: TelegramError) -> str:
+    """
+    Classify a get_chat_member failure.
+    
+    Args:
+        error: The error raised by the Bot API call
+    
+    Returns:
+        str: One of ERROR_PRIVACY, ERROR_FORBIDDEN, ERROR_USER_NOT_FOUND,
+            ERROR_BAD_REQUEST or ERROR_OTHER
+    """
+    error_msg = str(error).lower()
+    if "member list is inaccessible" in error_msg:
+        return ERROR_PRIVACY
+    if isinstance(error, Forbidden):
+        return ERROR_FORBIDDEN
+    if "user not found" in error_msg:
+        return ERROR_USER_NOT_FOUND
+    if "bad request" in error_msg:
+        return ERROR_BAD_REQUEST
+    return ERROR_OTHER
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    """Get the flood-wait duration of a RetryAfter error in seconds."""
+    retry_after = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given (1-based) attempt."""
+    return random.uniform(0, min(MEMBERSHIP_RETRY_MAX_DELAY, MEMBERSHIP_RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+@traced("check_channel", result_attribute="status")
+async def _check_channel(bot: Bot, user_id: int, channel: dict, semaphore: asyncio.Semaphore,
+                         cache: Optional[MembershipCache] = None,
+                         index: Optional[MembershipIndex] = None,
+                         breakers: Optional[BreakerRegistry] = None,
+                         deadline: Optional[float] = None, priority: Optional[int] = None,
+                         cached_only: bool = False) -> str:
+    """
+    Check whether a user is a member of a single channel.
+    
+    Args:
+        bot: The Telegram bot instance
+        user_id: The user ID to check membership for
+        channel: Channel dictionary containing at least 'username'
+        semaphore: Semaphore bounding concurrent lookups for this verification
+        cache: Optional membership cache consulted before calling the API
+        index: Optional push-based membership index consulted first
+        breakers: Optional circuit breakers; a channel whose breaker is open is
+            reported as unverifiable without calling the API
+        deadline: Event loop time by which the lookup must finish, retries
+            included; defaults to MEMBERSHIP_CHECK_DEADLINE from now
+        priority: Optional rate limiter priority passed as rate_limit_args
+        cached_only: Answer from the index and cache only, never calling the API
+    
+    Returns:
+        str: STATUS_JOINED, STATUS_NOT_JOINED, STATUS_UNVERIFIABLE if the bot
+            can't read the channel's member list, or STATUS_UNKNOWN if transient
+            failures (timeouts, network errors, flood waits) outlasted the retries
+            or cached_only found nothing cached
+    """
+    channel_username = channel['username']
+    span = current_span()
+    span.set(channel=channel_username)
+    if index is not None:
+        indexed = index.lookup(user_id, channel_username)
+        if indexed is not None:
+            logger.debug("Index hit for user %s in @%s: %s", user_id, channel_username, indexed)
+            MEMBERSHIP_LOOKUPS.inc(channel=channel_username, source="index")
+            span.set(source="index")
+            return STATUS_JOINED if indexed else STATUS_NOT_JOINED
+    
+    if cache is not None:
+        cached = cache.get(user_id, channel_username)
+        if cached is not None:
+            logger.debug("Cache hit for user %s in @%s: %s", user_id, channel_username, cached)
+            MEMBERSHIP_LOOKUPS.inc(channel=channel_username, source="cache")
+            span.set(source="cache")
+            return STATUS_JOINED if cached else STATUS_NOT_JOINED
+    
+    if cached_only:
+        MEMBERSHIP_LOOKUPS.inc(channel=channel_username, source="shed")
+        span.set(source="shed")
+        return STATUS_UNKNOWN
+    
+    breaker = breakers.get(channel_username) if breakers is not None else None
+    if breaker is not None and not breaker.allow():
+        logger.debug("Circuit breaker open for @%s, skipping check for user %s", channel_username, user_id)
+        MEMBERSHIP_LOOKUPS.inc(channel=channel_username, source="breaker")
+        span.set(source="breaker")
+        return STATUS_UNVERIFIABLE
+    
+    MEMBERSHIP_LOOKUPS.inc(channel=channel_username, source="api")
+    span.set(source="api")
+    loop = asyncio.get_running_loop()
+    if deadline is None:
+        deadline = loop.time() + MEMBERSHIP_CHECK_DEADLINE
+    attempts = max(1, MEMBERSHIP_RETRY_ATTEMPTS)
+    rate_limit_kwargs = {"rate_limit_args": priority} if priority is not None else {}
+    
+    for attempt in range(1, attempts + 1):
+        started = None
+        retry_after = None
+        try:
+            async with semaphore:
+                started = time.perf_counter()
+                # Try to get chat member status
+                with tracer.span("get_chat_member", channel=channel_username, attempt=attempt) as call:
+                    member = await asyncio.wait_for(
+                        bot.get_chat_member(
+                            chat_id=chat_id_for(channel), 
+                            user_id=user_id,
+                            **rate_limit_kwargs
+                        ),
+                        timeout=min(MEMBERSHIP_CHECK_TIMEOUT, deadline - loop.time())
+                    )
+                    call.set(member_status=member.status)
+        
+        except asyncio.TimeoutError:
+            reason = "timeout"
+        except RetryAfter as e:
+            reason = "retry_after"
+            retry_after = _retry_after_seconds(e)
+        except (BadRequest, Forbidden) as e:
+            # BadRequest subclasses NetworkError but is never transient, so it must be caught first
+            return _membership_error_status(e, user_id, channel_username, started, breaker)
+        except NetworkError:
+            # Includes TimedOut raised by the HTTP layer
+            reason = "network"
+        except TelegramError as e:
+            return _membership_error_status(e, user_id, channel_username, started, breaker)
+        
+        else:
+            # Check membership status
+            is_member = member.status in ['member', 'administrator', 'creator']
+            GET_CHAT_MEMBER_LATENCY.observe(
+                time.perf_counter() - started, channel=channel_username,
+                outcome="member" if is_member else "not_member"
+            )
+            if breaker is not None:
+                breaker.record_success()
+            if cache is not None:
+                cache.set(user_id, channel_username, is_member)
+            if index is not None:
+                index.record(user_id, channel_username, is_member)
+            
+            logger.debug(
+                "User %s is %s of @%s (status: %s)", 
+                user_id, "member" if is_member else "not member", channel_username, member.status
+            )
+            return STATUS_JOINED if is_member else STATUS_NOT_JOINED
+        
+        # Transient failure: retry after a backoff if the deadline allows it
+        GET_CHAT_MEMBER_LATENCY.observe(
+            time.perf_counter() - started, channel=channel_username, outcome=reason
+        )
+        MEMBERSHIP_ERRORS.inc(error_class=reason)
+        delay = retry_after if retry_after is not None else _backoff_delay(attempt)
+        if attempt == attempts or loop.time() + delay >= deadline:
+            break
+        
+        MEMBERSHIP_RETRIES.inc(channel=channel_username, reason=reason)
+        logger.debug(
+            "Retrying @%s for user %s in %.2fs after %s (attempt %s/%s)",
+            channel_username, user_id, delay, reason, attempt, attempts
+        )
+        await asyncio.sleep(delay)
+    
+    if breaker is not None:
+        breaker.record_inconclusive()
+    logger.warning(
+        "Could not confirm membership of user %s in @%s after %s attempt(s) (last error: %s)",
+        user_id, channel_username, attempt, reason
+    )
+    return STATUS_UNKNOWN
+
+def _membership_error_status(error: TelegramError, user_id: int, channel_username: str,
+                             started: Optional[float], breaker: Optional[CircuitBreaker]) -> str:
+    """
+    Record and log a non-transient get_chat_member failure.
+    
+    Args:
+        error: The error raised by the Bot API call
+        user_id: The user ID that was checked
+        channel_username: Username of the channel
+        started: perf_counter value when the call started, if it did
+        breaker: The channel's circuit breaker, if any
+    
+    Returns:
+        str: STATUS_UNVERIFIABLE for privacy/permission errors, otherwise STATUS_NOT_JOINED
+    """
+    error_class = classify_membership_error(error)
+    if started is not None:
+        GET_CHAT_MEMBER_LATENCY.observe(
+            time.perf_counter() - started, channel=channel_username, outcome=error_class
+        )
+    MEMBERSHIP_ERRORS.inc(error_class=error_class)
+    
+    if breaker is not None:
+        if error_class in BREAKER_ERRORS:
+            breaker.record_failure()
+        elif error_class == ERROR_USER_NOT_FOUND:
+            # The member list was readable, the user just isn't in it
+            breaker.record_success()
+        else:
+            breaker.record_inconclusive()
+    
+    # Log different error cases appropriately
+    if error_class in BREAKER_ERRORS:
+        logger.warning(
+            "Cannot verify membership for @%s due to privacy settings (%s)", 
+            channel_username, error_class
+        )
+        return STATUS_UNVERIFIABLE
+    elif error_class == ERROR_USER_NOT_FOUND:
+        logger.info(
+            "User %s not found in @%s", 
+            user_id, channel_username
+        )
+    elif error_class == ERROR_BAD_REQUEST:
+        logger.warning(
+            "Bad request while checking @%s: %s", 
+            channel_username, str(error)
+        )
+    else:
+        logger.error(
+            "Error checking membership for @%s: %s", 
+            channel_username, str(error)
+        )
+    return STATUS_NOT_JOINED
+
+class MembershipResult:
+    """Outcome of a membership check, with channels grouped by status."""
+    
+    __slots__ = ("joined", "not_joined", "unverifiable", "unknown", "pending")
+    
+    def __init__(self):
+        # Channels the user has joined
+        self.joined: List[dict] = []
+        # Every other channel, for safety; the lists below are subsets of it
+        self.not_joined: List[dict] = []
+        # Channels whose member list the bot can't read
+        self.unverifiable: List[dict] = []
+        # Channels that couldn't be confirmed before the deadline
+        self.unknown: List[dict] = []
+        # Channels still being checked in the background when the budget ran out
+        self.pending: List[dict] = []
+    
+    @property
+    def missing(self) -> List[dict]:
+        """Channels the user has definitely not joined."""
+        undecided = self.unverifiable + self.unknown + self.pending
+        return [channel for channel in self.not_joined if channel not in undecided]
+
+# Lookups that outlived a verification's response budget; referenced until they finish
+_background_lookups: Set[asyncio.Task] = set()
+
+def _finish_background_lookup(task: asyncio.Task) -> None:
+    _background_lookups.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug("Background membership lookup failed: %s", task.exception())
+
+@traced("check_user_membership")
+async def check_user_membership(bot: Bot, user_id: int,
+                                cache: Optional[MembershipCache] = None,
+                                index: Optional[MembershipIndex] = None,
+                                channels: Optional[Sequence[dict]] = None,
+                                breakers: Optional[BreakerRegistry] = None,
+                                budget: Optional[float] = None,
+                                priority: Optional[int] = None,
+                                cached_only: bool = False) -> MembershipResult:
     """
     Check user membership across all required channels.
     
+    Channel lookups run concurrently, bounded by MEMBERSHIP_CHECK_CONCURRENCY.
+    A failure or timeout on one channel does not cancel the other lookups.
+    Transient failures are retried with backoff until MEMBERSHIP_CHECK_DEADLINE,
+    which covers the whole verification rather than each channel.
+    
     Args:
         bot: The Telegram bot instance
         user_id: The user ID to check membership for
+        cache: Optional membership cache; only definitive member/not-member
+            results are stored, errors and timeouts are always re-checked
+        index: Optional membership index; channels it observes are answered
+            from memory and only the remaining channels are polled
+        channels: Channels to check; defaults to the active configuration
+        breakers: Optional per-channel circuit breakers that skip channels
+            whose member list can't be read
+        budget: Optional seconds to wait for results. Lookups still running
+            after that are reported as pending and finish in the background,
+            so their results land in the cache for the next check
+        priority: Optional rate limiter priority for the API calls, e.g.
+            PRIORITY_BACKGROUND; requires the bot to have a rate limiter
+        cached_only: Answer from the index and cache only; channels with
+            nothing cached are reported as unknown. Used to shed load
     
     Returns:
-        Tuple[List[dict], List[dict]]: A tuple containing two lists:
-            - List of channels the user has joined
-            - List of channels the user has not joined
+        MembershipResult: Channels grouped by outcome, each list in the order
+            of the checked channels
     
     Note:
         If membership cannot be verified due to privacy settings or errors,
-        the channel will be added to not_joined_channels for safety.
+        the channel will be added to not_joined for safety.
     """
-    joined_channels = []
-    not_joined_channels = []
+    if channels is None:
+        channels = current_config().channels
+    result = MembershipResult()
     
-    for channel in REQUIRED_CHANNELS:
-        channel_username = channel['username']
-        try:
-            # Try to get chat member status
-            member = await bot.get_chat_member(
-                chat_id=f"@{channel_username}", 
-                user_id=user_id
+    semaphore = asyncio.Semaphore(max(1, MEMBERSHIP_CHECK_CONCURRENCY))
+    deadline = asyncio.get_running_loop().time() + MEMBERSHIP_CHECK_DEADLINE
+    tasks = [
+        asyncio.ensure_future(
+            _check_channel(
+                bot, user_id, channel, semaphore, cache, index, breakers, deadline, priority, cached_only
             )
-            
-            # Check membership status
-            if member.status in ['member', 'administrator', 'creator']:
-                joined_channels.append(channel)
-                logger.info(
-                    "User %s is member of @%s (status: %s)", 
-                    user_id, channel_username, member.status
-                )
-            else:
-                not_joined_channels.append(channel)
-                logger.info(
-                    "User %s is not member of @%s (status: %s)", 
-                    user_id, channel_username, member.status
-                )
-                
-        except TelegramError as e:
-            error_msg = str(e).lower()
-            not_joined_channels.append(channel)
-            
-            # Log different error cases appropriately
-            if "member list is inaccessible" in error_msg:
-                logger.warning(
-                    "Cannot verify membership for @%s due to privacy settings", 
-                    channel_username
-                )
-            elif "bad request" in error_msg:
-                logger.warning(
-                    "Bad request while checking @%s: %s", 
-                    channel_username, str(e)
-                )
-            elif "user not found" in error_msg:
-                logger.info(
-                    "User %s not found in @%s", 
-                    user_id, channel_username
-                )
-            else:
-                logger.error(
-                    "Error checking membership for @%s: %s", 
-                    channel_username, str(e)
-                )
-    
-    return joined_channels, not_joined_channels
+        )
+        for channel in channels
+    ]
+    try:
+        if tasks:
+            await asyncio.wait(tasks, timeout=budget or None)
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        raise
+    
+    for channel, task in zip(channels, tasks):
+        if not task.done():
+            _background_lookups.add(task)
+            task.add_done_callback(_finish_background_lookup)
+            result.not_joined.append(channel)
+            result.pending.append(channel)
+        elif task.cancelled() or task.exception() is not None:
+            logger.error(
+                "Unexpected error checking membership for @%s: %s",
+                channel['username'], "cancelled" if task.cancelled() else str(task.exception())
+            )
+            result.not_joined.append(channel)
+            result.unknown.append(channel)
+        elif task.result() == STATUS_JOINED:
+            result.joined.append(channel)
+        else:
+            result.not_joined.append(channel)
+            if task.result() == STATUS_UNVERIFIABLE:
+                result.unverifiable.append(channel)
+            elif task.result() == STATUS_UNKNOWN:
+                result.unknown.append(channel)
+    
+    if result.pending:
+        logger.info(
+            "User %s has joined %s/%s required channels, %s still checking",
+            user_id, len(result.joined), len(channels), len(result.pending)
+        )
+    else:
+        logger.info(
+            "User %s has joined %s/%s required channels",
+            user_id, len(result.joined), len(channels)
+        )
+    current_span().set(
+        channels=len(channels), joined=len(result.joined), unknown=len(result.unknown),
+        unverifiable=len(result.unverifiable), pending=len(result.pending), cached_only=cached_only
+    )
+    return result
 
 def format_channel_list(channels: List[dict], with_links: bool = True) -> str:
     """
@@ -117,20 +473,22 @@ def format_remaining_channels(not_joined: List[dict]) -> str:
     """
     return format_channel_list(not_joined, with_links=True)
 
-async def is_bot_admin_in_channel(bot: Bot, channel_username: str) -> bool:
+async def is_bot_admin_in_channel(bot: Bot, channel_username: str,
+                                  chat_id: Optional[int] = None) -> bool:
     """
     Check if the bot has administrator rights in a specific channel.
     
     Args:
         bot: The Telegram bot instance
         channel_username: Username of the channel to check
+        chat_id: Numeric chat ID to query instead of the username, if known
     
     Returns:
         bool: True if bot is an admin, False otherwise
     """
     try:
         bot_member = await bot.get_chat_member(
-            chat_id=f"@{channel_username}", 
+            chat_id=chat_id if chat_id is not None else f"@{channel_username}", 
             user_id=bot.id
         )
         is_admin = bot_member.status in ['administrator', 'creator']
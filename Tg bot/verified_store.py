@@ -0,0 +1,336 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from config import (
+    VERIFIED_STORE_PATH, VERIFIED_VALIDITY_SECONDS, VERIFIED_STORE_BATCH_SIZE,
+    VERIFIED_STORE_FLUSH_INTERVAL
+)
+
+logger = logging.getLogger(__name__)
+
+# Verification methods recorded with each outcome
+METHOD_AUTO = "auto"
+METHOD_MANUAL = "manual"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS verified_users (
+    user_id INTEGER PRIMARY KEY,
+    verified INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+_CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweep_checkpoints (
+    name TEXT PRIMARY KEY,
+    cursor INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL
+)
+"""
+
+_UPSERT = """
+INSERT INTO verified_users (user_id, verified, method, updated_at)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(user_id) DO UPDATE SET
+    verified = excluded.verified,
+    method = excluded.method,
+    updated_at = excluded.updated_at
+"""
+
+class VerifiedStore:
+    """
+    SQLite-backed record of verification outcomes with write-behind batching.
+    
+    Handlers call record(), which only enqueues the outcome; a background task
+    writes queued outcomes in batches. All SQLite access runs on a dedicated
+    single-thread executor, so the event loop never blocks on disk.
+    """
+    
+    def __init__(self, path: str, validity_seconds: float, batch_size: int = 100,
+                 flush_interval: float = 1.0, stop_timeout: float = 10.0):
+        """
+        Initialize the store.
+        
+        Args:
+            path: SQLite database file; an empty string disables the store
+            validity_seconds: How long an automatic verification grants instant access
+            batch_size: Maximum outcomes written per transaction
+            flush_interval: Seconds to wait for more outcomes before writing a batch
+            stop_timeout: Seconds stop() waits for queued outcomes to be written
+        """
+        self.path = path
+        self.validity_seconds = validity_seconds
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stop_timeout = stop_timeout
+        
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._connection: Optional[sqlite3.Connection] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        # Outcomes queued but not yet written, so reads see them immediately
+        self._pending: Dict[int, Tuple[bool, str, float]] = {}
+        self.batches_written = 0
+        self.records_written = 0
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether a database path is configured."""
+        return bool(self.path)
+    
+    @property
+    def started(self) -> bool:
+        """Whether the store is open and accepting records."""
+        return self._writer is not None
+    
+    async def _run(self, func, *args):
+        """Run a blocking database function on the store's thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+    
+    def _open(self) -> None:
+        self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(_SCHEMA)
+        self._connection.execute(_CHECKPOINT_SCHEMA)
+        self._connection.commit()
+    
+    def _write_batch(self, rows: List[Tuple[int, int, str, float]]) -> None:
+        with self._connection:
+            self._connection.executemany(_UPSERT, rows)
+    
+    def _fetch(self, user_id: int) -> Optional[Tuple[int, str, float]]:
+        return self._connection.execute(
+            "SELECT verified, method, updated_at FROM verified_users WHERE user_id = ?",
+            (user_id,)
+        ).fetchone()
+    
+    def _fetch_granted(self, after_user_id: int, limit: int) -> List[Tuple[int, str]]:
+        return self._connection.execute(
+            "SELECT user_id, method FROM verified_users WHERE verified = 1 AND user_id > ? "
+            "ORDER BY user_id LIMIT ?",
+            (after_user_id, limit)
+        ).fetchall()
+    
+    def _fetch_checkpoint(self, name: str) -> Optional[Tuple[int, float, float]]:
+        return self._connection.execute(
+            "SELECT cursor, started_at, finished_at FROM sweep_checkpoints WHERE name = ?",
+            (name,)
+        ).fetchone()
+    
+    def _write_checkpoint(self, name: str, cursor: int, started_at: float, finished_at: float) -> None:
+        with self._connection:
+            self._connection.execute(
+                "INSERT INTO sweep_checkpoints (name, cursor, started_at, finished_at) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT(name) DO UPDATE SET cursor = excluded.cursor, "
+                "started_at = excluded.started_at, finished_at = excluded.finished_at",
+                (name, cursor, started_at, finished_at)
+            )
+    
+    async def start(self) -> None:
+        """Open the database and start the background writer."""
+        if not self.enabled or self.started:
+            return
+        
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="verified-store")
+        await self._run(self._open)
+        self._queue = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_loop())
+        logger.info("Verified-user store opened at %s", self.path)
+    
+    async def stop(self) -> None:
+        """Write queued outcomes, waiting at most stop_timeout seconds, and close the database."""
+        if not self.started:
+            return
+        
+        if self._writer.done():
+            # Nothing calls task_done() any more, so joining the queue would never return
+            logger.error("Verified-user store writer is not running, queued records can't be written")
+        else:
+            try:
+                await asyncio.wait_for(self._queue.join(), self.stop_timeout)
+            except asyncio.TimeoutError:
+                logger.error("Verified-user store writer did not finish within %ss", self.stop_timeout)
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error("Verified-user store writer failed: %s", str(e))
+        self._writer = None
+        if self._pending:
+            logger.warning("Dropped %s verification records that were never written", len(self._pending))
+            self._pending.clear()
+        
+        await self._run(self._connection.close)
+        self._executor.shutdown(wait=True)
+        logger.info(
+            "Verified-user store closed (%s records in %s batches)",
+            self.records_written, self.batches_written
+        )
+    
+    def record(self, user_id: int, verified: bool, method: str = METHOD_AUTO) -> None:
+        """
+        Queue a verification outcome for writing; never blocks.
+        
+        Args:
+            user_id: The user ID
+            verified: Whether the user passed verification
+            method: METHOD_AUTO for API-checked results, METHOD_MANUAL for force-verify
+        """
+        if not self.started:
+            return
+        
+        self._pending[user_id] = (verified, method, time.time())
+        self._queue.put_nowait(user_id)
+    
+    async def _write_loop(self) -> None:
+        """Drain the queue in batches and write them in one transaction each."""
+        loop = asyncio.get_running_loop()
+        while True:
+            user_ids = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(user_ids) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    user_ids.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            rows = {}
+            for user_id in user_ids:
+                if user_id in self._pending:
+                    verified, method, updated_at = self._pending[user_id]
+                    rows[user_id] = (user_id, int(verified), method, updated_at)
+            
+            try:
+                if rows:
+                    await self._run(self._write_batch, list(rows.values()))
+                    self.batches_written += 1
+                    self.records_written += len(rows)
+            except sqlite3.Error as e:
+                logger.error("Failed to write %s verification records: %s", len(rows), str(e))
+            finally:
+                for user_id, row in rows.items():
+                    # Keep outcomes recorded again while the batch was being written
+                    if self._pending.get(user_id, (None, None, None))[2] == row[3]:
+                        del self._pending[user_id]
+                for _ in user_ids:
+                    self._queue.task_done()
+    
+    async def get(self, user_id: int) -> Optional[Tuple[bool, str, float]]:
+        """
+        Get the latest recorded outcome for a user.
+        
+        Args:
+            user_id: The user ID
+        
+        Returns:
+            Optional[Tuple[bool, str, float]]: (verified, method, unix timestamp), or None
+        """
+        if not self.started:
+            return None
+        
+        pending = self._pending.get(user_id)
+        if pending is not None:
+            return pending
+        
+        try:
+            row = await self._run(self._fetch, user_id)
+        except sqlite3.Error as e:
+            logger.error("Failed to read verification record for user %s: %s", user_id, str(e))
+            return None
+        if row is None:
+            return None
+        return bool(row[0]), row[1], row[2]
+    
+    async def granted_users(self, after_user_id: int, limit: int) -> List[Tuple[int, str]]:
+        """
+        Page through users who were granted access, in user ID order.
+        
+        Args:
+            after_user_id: Only return users with a larger ID
+            limit: Maximum number of users to return
+        
+        Returns:
+            List[Tuple[int, str]]: (user_id, method) pairs; empty at the end or on errors
+        """
+        if not self.started:
+            return []
+        
+        try:
+            return await self._run(self._fetch_granted, after_user_id, limit)
+        except sqlite3.Error as e:
+            logger.error("Failed to read granted users after %s: %s", after_user_id, str(e))
+            return []
+    
+    async def load_checkpoint(self, name: str) -> Optional[Tuple[int, float, float]]:
+        """
+        Read a named sweep checkpoint.
+        
+        Args:
+            name: Checkpoint name
+        
+        Returns:
+            Optional[Tuple[int, float, float]]: (cursor, started_at, finished_at), or None
+        """
+        if not self.started:
+            return None
+        
+        try:
+            return await self._run(self._fetch_checkpoint, name)
+        except sqlite3.Error as e:
+            logger.error("Failed to read checkpoint %s: %s", name, str(e))
+            return None
+    
+    async def save_checkpoint(self, name: str, cursor: int, started_at: float, finished_at: float) -> None:
+        """
+        Write a named sweep checkpoint.
+        
+        Args:
+            name: Checkpoint name
+            cursor: Last user ID processed (0 when no sweep is in progress)
+            started_at: Unix time the current or last sweep started
+            finished_at: Unix time the last sweep finished
+        """
+        if not self.started:
+            return
+        
+        try:
+            await self._run(self._write_checkpoint, name, cursor, started_at, finished_at)
+        except sqlite3.Error as e:
+            logger.error("Failed to write checkpoint %s: %s", name, str(e))
+    
+    async def is_recently_verified(self, user_id: int) -> bool:
+        """
+        Check whether the user passed automatic verification within the validity window.
+        
+        Args:
+            user_id: The user ID
+        
+        Returns:
+            bool: True if access can be granted without re-checking channels
+        """
+        if self.validity_seconds <= 0:
+            return False
+        
+        outcome = await self.get(user_id)
+        if outcome is None:
+            return False
+        
+        verified, method, updated_at = outcome
+        return verified and method == METHOD_AUTO and time.time() - updated_at < self.validity_seconds
+
+# Shared store opened in post_init
+verified_store = VerifiedStore(
+    VERIFIED_STORE_PATH, VERIFIED_VALIDITY_SECONDS, VERIFIED_STORE_BATCH_SIZE,
+    VERIFIED_STORE_FLUSH_INTERVAL
+)
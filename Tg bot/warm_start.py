@@ -0,0 +1,136 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional
+from telegram import User
+from telegram.ext import ExtBot
+from config import WARM_START_PATH, WARM_START_MAX_AGE
+from utils import ChannelInfo, channel_registry
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+def _token_fingerprint(token: str) -> str:
+    """Identify the token a snapshot belongs to without storing it."""
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+def load_snapshot(token: str, path: str = WARM_START_PATH,
+                  max_age: float = WARM_START_MAX_AGE) -> Optional[dict]:
+    """
+    Read the warm-start snapshot for a bot token.
+    
+    Args:
+        token: The bot token the snapshot must belong to
+        path: Snapshot file; empty disables warm starts
+        max_age: Seconds after which a snapshot is ignored
+    
+    Returns:
+        Optional[dict]: The snapshot, or None if missing, stale, for another
+            token or unreadable
+    """
+    if not path:
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable warm-start snapshot %s: %s", path, e)
+        return None
+    
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        return None
+    if snapshot.get("token") != _token_fingerprint(token):
+        return None
+    if time.time() - snapshot.get("saved_at", 0) > max_age:
+        logger.info("Warm-start snapshot is older than %ss, starting cold", max_age)
+        return None
+    return snapshot
+
+def save_snapshot(token: str, bot_user: User, registry: Dict[str, ChannelInfo],
+                  path: str = WARM_START_PATH) -> None:
+    """
+    Write the warm-start snapshot atomically.
+    
+    Args:
+        token: The bot token (only a fingerprint is stored)
+        bot_user: The bot's identity as returned by getMe
+        registry: Resolved channels to store
+        path: Snapshot file; empty disables warm starts
+    """
+    if not path:
+        return
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "token": _token_fingerprint(token),
+        "saved_at": time.time(),
+        "bot": bot_user.to_dict(),
+        "channels": {
+            key: {"username": info.username, "chat_id": info.chat_id, "title": info.title,
+                  "is_admin": info.is_admin}
+            for key, info in registry.items() if info.chat_id is not None
+        },
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("Could not write warm-start snapshot %s: %s", path, e)
+
+def seed_channel_registry(snapshot: dict) -> int:
+    """
+    Fill the channel registry from a snapshot.
+    
+    Args:
+        snapshot: A snapshot returned by load_snapshot
+    
+    Returns:
+        int: Number of channels seeded
+    """
+    channels = snapshot.get("channels", {})
+    for key, data in channels.items():
+        channel_registry[key] = ChannelInfo(
+            data["username"], data.get("chat_id"), data.get("title"), bool(data.get("is_admin"))
+        )
+    return len(channels)
+
+class WarmStartBot(ExtBot):
+    """
+    ExtBot whose first get_me is answered from the warm-start snapshot.
+    
+    Bot.initialize() calls get_me to cache the bot's identity. With a
+    snapshot, that call returns the saved identity without a round trip, so
+    startup doesn't wait on the Bot API. Later get_me calls go to the API.
+    """
+    
+    def __init__(self, *args, cached_identity: Optional[dict] = None, **kwargs):
+        """
+        Initialize the bot.
+        
+        Args:
+            *args: Passed to ExtBot
+            cached_identity: getMe result from the snapshot, if any
+            **kwargs: Passed to ExtBot
+        """
+        super().__init__(*args, **kwargs)
+        self._cached_identity = cached_identity
+    
+    @property
+    def identity_from_snapshot(self) -> bool:
+        """Whether the current identity came from the snapshot rather than the API."""
+        return self._cached_identity is not None
+    
+    async def get_me(self, *args, **kwargs) -> User:
+        """Return the cached identity once, then call the Bot API."""
+        if self._cached_identity is not None and self._bot_user is None:
+            self._bot_user = User.de_json(self._cached_identity, self)
+            return self._bot_user
+        user = await super().get_me(*args, **kwargs)
+        self._cached_identity = None
+        return user